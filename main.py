@@ -1,37 +1,47 @@
 import discord
 from discord.ext import commands
 import logging
+import logging.handlers
+import queue
 from dotenv import load_dotenv
 import os
 import asyncio
-from aiohttp import web
 import httpx
-import json
+import orjson
 import aiosqlite
-from datetime import datetime
 import random
 from typing import Optional
 import re
-import subprocess
 from music import MusicBot, YouTubeAudioSource  # restore music functionality imports
+from playlist import MUSIC_PLAYLISTS
 import base64
 import io
-import traceback
 import time
+import hashlib
+from collections import OrderedDict
+
+try:
+    import uvloop  # libuv event loop; not available on Windows, which keeps the default loop
+except ImportError:
+    uvloop = None
+
+try:
+    import h2  # noqa: F401 -- lets httpx multiplex requests over one HTTP/2 connection
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
 
 # Ensure opus is loaded for voice support
 if not discord.opus.is_loaded():
-    # Try to load opus
-    try:
-        discord.opus.load_opus('opus')
-    except:
+    # Try each platform's library name until one loads
+    for opus_lib in ('opus', 'libopus.so.0', 'libopus-0.dll', 'libopus.0.dylib'):
         try:
-            discord.opus.load_opus('libopus.so.0')
-        except:
-            try:
-                discord.opus.load_opus('libopus-0.dll')
-            except:
-                print("⚠️  Warning: Could not load opus library. Voice features may not work properly.")
+            discord.opus.load_opus(opus_lib)
+            break
+        except OSError:
+            continue
+    else:
+        print("⚠️  Warning: Could not load opus library. Voice features may not work properly.")
 
 print(f"Opus loaded: {discord.opus.is_loaded()}")
 
@@ -48,6 +58,17 @@ if youtube_api_key is None:
     print("Warning: YOUTUBE_API_KEY not set. YouTube API features will be disabled.")
 
 handler = logging.FileHandler(filename='discord.log', encoding='utf-8', mode='w')
+# Records are queued on the event loop and formatted/written by the listener's thread
+log_queue = queue.SimpleQueue()
+log_console = logging.StreamHandler()
+log_formatter = logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s')
+handler.setFormatter(log_formatter)
+log_console.setFormatter(log_formatter)
+log_listener = logging.handlers.QueueListener(log_queue, log_console, handler)
+logging.getLogger().addHandler(logging.handlers.QueueHandler(log_queue))
+logging.getLogger().setLevel(logging.INFO)
+logger = logging.getLogger("dogbot")
+
 intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
@@ -71,8 +92,30 @@ tank_role_name = "Tank"
 healer_role_name = "Healer"
 dps_role_name = "DPS"
 
+# Shared role command responses
+_NO_PERM = "❌ You need Admin or Moderator role to use this command!"
+_NO_PERM_REMOVE = "❌ You need Admin or Moderator role to remove roles from others!"
+_CANT_ASSIGN = "❌ I don't have permission to assign roles!"
+_CANT_REMOVE = "❌ I don't have permission to remove roles!"
+_ROLE_MISSING = {
+    name: f"❌ The '{name}' role doesn't exist on this server!"
+    for name in (dogs_role_name, cats_role_name, lizards_role_name, pvp_role_name, elves_role_name,
+                 tank_role_name, healer_role_name, dps_role_name)
+}
+
 # Initialize global variables for music functionality
 music_bot = None
+# The playlist is loaded once at import and never modified (adding songs is disabled)
+_PLAYLIST_COUNT = len(MUSIC_PLAYLISTS)
+
+# Audio component status shown by !audiotest. FFmpeg is filled in by _probe_ffmpeg() on
+# the first on_ready; yt-dlp is always present since music.py imports it.
+_AUDIO_STATUS = {
+    "yt_dlp": "✅ Available",
+    "ffmpeg": "⏳ Not checked yet",
+    "playlist": f"✅ {_PLAYLIST_COUNT} songs loaded",
+}
+ffmpeg_probed = False
 
 # YouTube Data API v3 Configuration
 YOUTUBE_API_BASE_URL = "https://www.googleapis.com/youtube/v3"
@@ -80,8 +123,115 @@ YOUTUBE_API_BASE_URL = "https://www.googleapis.com/youtube/v3"
 # Venice AI Configuration
 VENICE_API_URL = "https://api.venice.ai/api/v1/chat/completions"
 VENICE_MODEL = "venice-uncensored"
+# httpx's timeout applies per connect/read/write; this caps a whole AI request
+AI_RESPONSE_TIMEOUT = 45.0
 IMAGE_API_URL = "https://api.venice.ai/api/v1/image/generate"
 
+# Shared pieces of every Venice chat request, built once at import
+_SYSTEM_MSG = {"role": "system", "content": "You are Dogbot, a helpful AI assistant with a friendly dog personality! 🐕 Use emojis frequently and Discord formatting to make your responses engaging and fun! Use **bold** for emphasis, *italics* for subtle emphasis, `code blocks` for technical terms, and > quotes for highlighting important information. Keep responses conversational and helpful! 😊✨"}
+_VENICE_HEADERS = {
+    "Authorization": f"Bearer {venice_api_key}",
+    "Content-Type": "application/json"
+} if venice_api_key else {}
+# Image requests prefer binary bodies; JSON is only a fallback for servers that ignore return_binary
+_IMAGE_HEADERS = {
+    **_VENICE_HEADERS,
+    "Accept": "image/webp, image/png;q=0.9, application/json;q=0.5"
+} if venice_api_key else {}
+# Fixed image generation settings; each request only adds its prompt
+_IMAGE_PAYLOAD_TEMPLATE = {
+    "model": "hidream",
+    "format": "webp",
+    "width": 1024,
+    "height": 1024,
+    "steps": 20,
+    "safe_mode": True,
+    "hide_watermark": True,
+    "embed_exif_metadata": False,
+    "return_binary": True,  # ask for raw image bytes rather than base64 JSON
+    "seed": 0
+}
+
+# Shared HTTP client so Venice/YouTube connections stay alive between calls
+http_client: Optional[httpx.AsyncClient] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared HTTP client, creating it on first use"""
+    global http_client
+    if http_client is None or http_client.is_closed:
+        http_client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=30.0,
+            limits=httpx.Limits(max_keepalive_connections=20, keepalive_expiry=30),
+        )
+    return http_client
+
+async def close_http_client():
+    """Close the shared HTTP client"""
+    global http_client
+    if http_client is not None:
+        await http_client.aclose()
+        http_client = None
+
+class TTLCache:
+    """Small LRU cache whose entries expire a fixed number of seconds after being stored"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+
+    def get(self, key, default=None):
+        item = self._data.get(key)
+        if item is None:
+            return default
+        expires, value = item
+        if expires < time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+_MISSING = object()
+
+# YouTube responses change slowly and the API has a daily quota, so serve repeats from memory
+_YT_SEARCH_CACHE = TTLCache(maxsize=512, ttl=3600)
+_YT_VIDEO_CACHE = TTLCache(maxsize=2048, ttl=86400)
+_yt_inflight: dict = {}  # cache key -> task fetching it, so concurrent misses share one request
+# Caps how many YouTube Data API requests are open at once
+MAX_CONCURRENT_YOUTUBE_REQUESTS = 8
+youtube_request_semaphore = asyncio.Semaphore(MAX_CONCURRENT_YOUTUBE_REQUESTS)
+
+async def _cached_youtube_fetch(cache: TTLCache, key, fetch):
+    """Return a cached YouTube response, or fetch it once for all concurrent callers"""
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+    task = _yt_inflight.get(key)
+    if task is None:
+        async def fetch_and_store():
+            async with youtube_request_semaphore:
+                result = await fetch()
+            cache[key] = result
+            return result
+        task = asyncio.create_task(fetch_and_store())
+        _yt_inflight[key] = task
+        task.add_done_callback(lambda _: _yt_inflight.pop(key, None))
+    # shield so one caller being cancelled doesn't cancel the fetch for the others
+    return await asyncio.shield(task)
+
+# Video ID in watch URLs (v= as any query parameter), embed URLs and youtu.be short links
+_YT_ID_RE = re.compile(r'(?:youtube\.com/(?:watch\?(?:[^&#\n]*&)*?v=|embed/)|youtu\.be/)([^&\n?#]+)')
+
 class YouTubeAPI:
     """YouTube Data API v3 integration for reliable cloud deployment"""
     
@@ -105,10 +255,12 @@ class YouTubeAPI:
             'videoSyndicated': 'true',  # Only syndicated videos
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{YOUTUBE_API_BASE_URL}/search", params=params)
+        async def fetch():
+            response = await get_http_client().get(f"{YOUTUBE_API_BASE_URL}/search", params=params, timeout=5.0)
             response.raise_for_status()
-            return response.json()
+            return orjson.loads(response.content)
+        
+        return await _cached_youtube_fetch(_YT_SEARCH_CACHE, ('search', query.lower(), max_results), fetch)
     
     async def get_video_details(self, video_id: str):
         """Get detailed information about a YouTube video"""
@@ -121,30 +273,22 @@ class YouTubeAPI:
             'key': self.api_key
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{YOUTUBE_API_BASE_URL}/videos", params=params)
+        async def fetch():
+            response = await get_http_client().get(f"{YOUTUBE_API_BASE_URL}/videos", params=params, timeout=5.0)
             response.raise_for_status()
-            data = response.json()
+            data = orjson.loads(response.content)
             
             if not data.get('items'):
                 return None
                 
             return data['items'][0]
+        
+        return await _cached_youtube_fetch(_YT_VIDEO_CACHE, ('video', video_id), fetch)
     
     def extract_video_id(self, url: str) -> Optional[str]:
         """Extract video ID from various YouTube URL formats"""
-        
-        patterns = [
-            r'(?:youtube\.com\/watch\?v=|youtu\.be\/|youtube\.com\/embed\/)([^&\n?#]+)',
-            r'youtube\.com\/watch\?.*v=([^&\n?#]+)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, url)
-            if match:
-                return match.group(1)
-        
-        return None
+        match = _YT_ID_RE.search(url)
+        return match.group(1) if match else None
     
     def get_youtube_url(self, video_id: str) -> str:
         """Generate a clean YouTube URL from video ID"""
@@ -154,55 +298,182 @@ class YouTubeAPI:
 youtube_api = YouTubeAPI() if youtube_api_key else None
 
 # Database setup
+# Shared connection to the chat history database, opened once by init_database()
+chat_db: Optional[aiosqlite.Connection] = None
+# Serializes write transactions on the shared connection so commits don't interleave
+db_write_lock = asyncio.Lock()
+# Stored in PRAGMA user_version; bump whenever the schema below changes
+SCHEMA_VERSION = 3
+
 async def init_database():
-    """Initialize the chat history database"""
-    async with aiosqlite.connect("chat_history.db") as db:
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS chat_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                user_name TEXT NOT NULL,
-                channel_id TEXT NOT NULL,
-                message TEXT NOT NULL,
-                response TEXT NOT NULL,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Create undo stack table for universal undo/redo
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS undo_stack (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                channel_id TEXT NOT NULL,
-                user_id TEXT NOT NULL,
-                action_type TEXT NOT NULL,  -- 'chat'
-                action_id INTEGER NOT NULL,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Migration: Add user_id and action_type columns to existing undo_stack if they don't exist
-        try:
-            await db.execute("ALTER TABLE undo_stack ADD COLUMN user_id TEXT")
-        except:
-            pass  # Column already exists
-        
-        try:
-            await db.execute("ALTER TABLE undo_stack ADD COLUMN action_type TEXT DEFAULT 'chat'")
-        except:
-            pass  # Column already exists
-            
-        await db.commit()
+    """Open the shared chat history connection and create the tables"""
+    global chat_db
+    if chat_db is None:
+        chat_db = await aiosqlite.connect("chat_history.db")
+        # WAL lets reads run alongside writes and NORMAL sync makes commits cheap
+        await chat_db.execute("PRAGMA journal_mode=WAL")
+        await chat_db.execute("PRAGMA synchronous=NORMAL")
+        await chat_db.execute("PRAGMA temp_store=MEMORY")
+        await chat_db.execute("PRAGMA cache_size=-20000")  # ~20 MB page cache
+        await chat_db.execute("PRAGMA mmap_size=268435456")  # map up to 256 MB for reads
+    db = chat_db
+
+    # Skip the DDL entirely when the file is already on the current schema
+    cursor = await db.execute("PRAGMA user_version")
+    (version,) = await cursor.fetchone()
+    if version >= SCHEMA_VERSION:
+        return
+
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS chat_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            user_name TEXT NOT NULL,
+            channel_id TEXT NOT NULL,
+            message TEXT NOT NULL,
+            response TEXT NOT NULL,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    # Create undo stack table for universal undo/redo
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS undo_stack (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            channel_id TEXT NOT NULL,
+            user_id TEXT NOT NULL,
+            action_type TEXT NOT NULL,  -- 'chat'
+            action_id INTEGER NOT NULL,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    # AI replies kept across restarts; see get_cached_ai_reply()
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS ai_cache (
+            key BLOB PRIMARY KEY,
+            reply TEXT NOT NULL,
+            expires REAL NOT NULL  -- time.time() after which the reply is stale
+        ) WITHOUT ROWID
+    """)
+    
+    # Migration: Add user_id and action_type columns to existing undo_stack if they don't exist
+    cursor = await db.execute("PRAGMA table_info(undo_stack)")
+    columns = {row[1] for row in await cursor.fetchall()}
+    if 'user_id' not in columns:
+        await db.execute("ALTER TABLE undo_stack ADD COLUMN user_id TEXT")
+    if 'action_type' not in columns:
+        await db.execute("ALTER TABLE undo_stack ADD COLUMN action_type TEXT DEFAULT 'chat'")
+
+    # History lookups filter on user_id and order by timestamp; undo also filters on channel_id.
+    # idx_chat_user_time covers everything the older user_id-only index did.
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_chat_user_time ON chat_history(user_id, timestamp DESC)")
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_chat_channel_user_time ON chat_history(channel_id, user_id, timestamp DESC)")
+    await db.execute("DROP INDEX IF EXISTS idx_ch_user")
+    # Refresh planner statistics so the new indexes get picked up
+    await db.execute("ANALYZE")
+
+    await db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    await db.commit()
+
+async def prune_ai_cache():
+    """Delete expired rows from the persistent AI reply cache"""
+    async with db_write_lock:
+        await chat_db.execute("DELETE FROM ai_cache WHERE expires <= ?", (time.time(),))
+        await chat_db.commit()
+
+async def close_database():
+    """Flush pending chat writes and close the shared chat history connection"""
+    global chat_db, chat_writer_task
+    if chat_writer_task is not None:
+        # The writer flushes what it has and exits when it reaches the None sentinel
+        chat_write_queue.put_nowait(None)
+        await chat_writer_task
+        chat_writer_task = None
+    if chat_db is not None:
+        # Rows queued after the sentinel go out in one last batch
+        leftover = []
+        while not chat_write_queue.empty():
+            item = chat_write_queue.get_nowait()
+            if item is not None:
+                leftover.append(item)
+        if leftover:
+            await _write_chat_batch(leftover)
+        await chat_db.close()
+        chat_db = None
+
+# chat_history inserts are queued and written in batches by chat_history_writer()
+CHAT_WRITE_BATCH_SIZE = 100
+CHAT_WRITE_DELAY = 0.1  # seconds to wait for more rows before flushing
+chat_write_queue: asyncio.Queue = asyncio.Queue()
+chat_writer_task: Optional[asyncio.Task] = None
+
+async def _write_chat_batch(batch):
+    """Insert a batch of queued rows in one transaction and resolve their futures with the new row IDs"""
+    rows = [row for row, _ in batch]
+    try:
+        db = chat_db
+        async with db_write_lock:
+            try:
+                await db.executemany(
+                    "INSERT INTO chat_history (user_id, user_name, channel_id, message, response) VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+                # Rows get consecutive IDs since this is the only writer inside the transaction
+                cursor = await db.execute("SELECT last_insert_rowid()")
+                (last_id,) = await cursor.fetchone()
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+    except Exception as e:
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(e)
+        return
+    first_id = last_id - len(batch) + 1
+    for i, (_, future) in enumerate(batch):
+        if not future.done():
+            future.set_result(first_id + i)
+
+async def chat_history_writer():
+    """Background task that drains chat_write_queue into batched inserts"""
+    loop = asyncio.get_running_loop()
+    stopping = False
+    while not stopping:
+        item = await chat_write_queue.get()
+        if item is None:
+            return
+        batch = [item]
+        deadline = loop.time() + CHAT_WRITE_DELAY
+        while len(batch) < CHAT_WRITE_BATCH_SIZE:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(chat_write_queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            if item is None:
+                stopping = True
+                break
+            batch.append(item)
+        await _write_chat_batch(batch)
+
+def start_chat_writer():
+    """Start the chat_history batch writer if it isn't running"""
+    global chat_writer_task
+    if chat_writer_task is None or chat_writer_task.done():
+        chat_writer_task = asyncio.create_task(chat_history_writer())
 
 async def save_chat_history(user_id: str, user_name: str, channel_id: str, message: str, response: str) -> int:
     """Save chat interaction to database, returns the action ID"""
-    async with aiosqlite.connect("chat_history.db") as db:
-        cursor = await db.execute(
-            "INSERT INTO chat_history (user_id, user_name, channel_id, message, response) VALUES (?, ?, ?, ?, ?)",
-            (user_id, user_name, channel_id, message, response)
-        )
-        await db.commit()
-        return cursor.lastrowid or 0
+    if chat_db is not None:
+        # Restart the writer if it died, so the queued row doesn't wait forever
+        start_chat_writer()
+    future = asyncio.get_running_loop().create_future()
+    chat_write_queue.put_nowait(((user_id, user_name, channel_id, message, response), future))
+    return await future or 0
 
 async def save_chat_message(user_id: str, message: str, response: str) -> int:
     """Simple wrapper for save_chat_history with default values"""
@@ -211,67 +482,145 @@ async def save_chat_message(user_id: str, message: str, response: str) -> int:
 async def clear_user_chat_history(user_id: str) -> bool:
     """Clear all chat history for a specific user"""
     try:
-        async with aiosqlite.connect("chat_history.db") as db:
+        db = chat_db
+        async with db_write_lock:
             await db.execute("DELETE FROM chat_history WHERE user_id = ?", (user_id,))
             await db.commit()
-            return True
+        return True
     except Exception:
         return False
 
 async def get_chat_history(user_id: str, limit: int = 5):
-    """Get recent chat history for a user (for context)"""
-    async with aiosqlite.connect("chat_history.db") as db:
-        cursor = await db.execute(
-            "SELECT message, response FROM chat_history WHERE user_id = ? ORDER BY timestamp ASC LIMIT ?",
-            (user_id, limit)
-        )
-        rows = await cursor.fetchall()
-        return [(str(row[0]), str(row[1])) for row in rows]
+    """Get recent chat history for a user (for context), oldest first"""
+    db = chat_db
+    # Walk idx_chat_user_time newest-first so LIMIT keeps the latest exchanges. timestamp only
+    # has one-second resolution (a writer batch shares one value), so id breaks the ties.
+    cursor = await db.execute(
+        "SELECT message, response FROM chat_history WHERE user_id = ? ORDER BY timestamp DESC, id DESC LIMIT ?",
+        (user_id, limit)
+    )
+    rows = await cursor.fetchall()
+    # Both columns are NOT NULL TEXT, so the rows are already (str, str) tuples
+    rows.reverse()
+    return rows
+
+async def get_chat_history_preview(user_id: str, limit: int = 5, message_chars: int = 100, response_chars: int = 200):
+    """Get recent chat history for display, truncated by SQLite so full texts are never loaded"""
+    db = chat_db
+    cursor = await db.execute(
+        """
+        SELECT
+            CASE WHEN length(message) > ? THEN substr(message, 1, ?) || '...' ELSE message END,
+            CASE WHEN length(response) > ? THEN substr(response, 1, ?) || '...' ELSE response END
+        FROM chat_history WHERE user_id = ? ORDER BY timestamp DESC, id DESC LIMIT ?
+        """,
+        (message_chars, message_chars, response_chars, response_chars, user_id, limit)
+    )
+    rows = await cursor.fetchall()
+    rows.reverse()
+    return rows
 
 async def undo_last_action(channel_id: str, user_id: str) -> tuple[bool, str]:
     """Undo the last chat action by the user in the channel. Returns (success, message)"""
-    async with aiosqlite.connect("chat_history.db") as db:
-        # Try chat action
-        cursor = await db.execute(
-            "SELECT id, user_name, message FROM chat_history WHERE channel_id = ? AND user_id = ? ORDER BY timestamp DESC LIMIT 1",
-            (channel_id, user_id)
-        )
-        chat_row = await cursor.fetchone()
-        
-        if not chat_row:
-            return False, "No actions to undo!"
-        
-        action_id, user_name, message = chat_row
-        
-        # Delete chat action
-        await db.execute(
-            "DELETE FROM chat_history WHERE id = ?",
-            (action_id,)
-        )
-        
-        # Add to undo stack
-        await db.execute(
-            "INSERT INTO undo_stack (channel_id, user_id, action_type, action_id) VALUES (?, ?, ?, ?)",
-            (channel_id, user_id, 'chat', action_id)
-        )
-        
-        await db.commit()
+    db = chat_db
+    async with db_write_lock:
+        # Take the write lock up front so the DELETE and INSERT land as one transaction
+        await db.execute("BEGIN IMMEDIATE")
+        try:
+            # Delete the latest chat action and get its details back in the same statement
+            # (DELETE ... RETURNING needs SQLite 3.35+); id breaks ties between same-second rows
+            cursor = await db.execute(
+                """
+                DELETE FROM chat_history WHERE id = (
+                    SELECT id FROM chat_history WHERE channel_id = ? AND user_id = ? ORDER BY timestamp DESC, id DESC LIMIT 1
+                )
+                RETURNING id, user_name, message
+                """,
+                (channel_id, user_id)
+            )
+            chat_row = await cursor.fetchone()
+            
+            if not chat_row:
+                await db.rollback()
+                return False, "No actions to undo!"
+            
+            action_id, user_name, message = chat_row
+            
+            # Add to undo stack
+            await db.execute(
+                "INSERT INTO undo_stack (channel_id, user_id, action_type, action_id) VALUES (?, ?, ?, ?)",
+                (channel_id, user_id, 'chat', action_id)
+            )
+            
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
         return True, f"Undone chat message by {user_name}: {message[:100]}..."
 
 async def redo_last_undo(channel_id: str, user_id: str) -> tuple[bool, str]:
     """Redo the last undone action by the user. Returns (success, message)"""
-    async with aiosqlite.connect("chat_history.db") as db:
-        return False, "Chat actions cannot be redone once undone!"
+    return False, "Chat actions cannot be redone once undone!"
+
+# Recent AI replies keyed by a digest of the requesting user plus the full request payload
+# (model, messages incl. history, limits), so one user's reply is never served to another.
+# Hot entries live in memory; the ai_cache table keeps them for a day across restarts.
+# Caching is opt-in (use_cache=True) since replies are sampled; !chat and !ask don't use it.
+_AI_CACHE = TTLCache(maxsize=256, ttl=300)
+AI_CACHE_DB_TTL = 86400
+
+def _ai_cache_key(user_id: str, data: dict) -> bytes:
+    """Digest of the user and their Venice request payload, used as the AI cache key"""
+    return hashlib.blake2b(orjson.dumps([user_id, data]), digest_size=16).digest()
+
+async def get_cached_ai_reply(key: bytes) -> Optional[str]:
+    """Look up a cached AI reply in memory, then in the ai_cache table"""
+    reply = _AI_CACHE.get(key)
+    if reply is not None or chat_db is None:
+        return reply
+    try:
+        cursor = await chat_db.execute("SELECT reply FROM ai_cache WHERE key = ? AND expires > ?", (key, time.time()))
+        row = await cursor.fetchone()
+    except Exception:
+        return None
+    if row is None:
+        return None
+    _AI_CACHE[key] = row[0]
+    return row[0]
+
+async def store_ai_reply(key: bytes, reply: str):
+    """Remember an AI reply in memory and in the ai_cache table"""
+    _AI_CACHE[key] = reply
+    if chat_db is None:
+        return
+    try:
+        async with db_write_lock:
+            await chat_db.execute(
+                "INSERT OR REPLACE INTO ai_cache (key, reply, expires) VALUES (?, ?, ?)",
+                (key, reply, time.time() + AI_CACHE_DB_TTL)
+            )
+            await chat_db.commit()
+    except Exception as e:
+        logger.warning("[AI_CACHE] Could not persist reply: %s", e)
+
+# Caps how many Venice chat requests are open at once; the rest wait their turn (the wait
+# counts toward AI_RESPONSE_TIMEOUT) instead of piling up sockets during a burst of !chat
+MAX_CONCURRENT_AI_REQUESTS = 16
+ai_request_semaphore = asyncio.Semaphore(MAX_CONCURRENT_AI_REQUESTS)
 
-async def get_ai_response_with_history(user_id: str, prompt: str, max_tokens: int = 500, use_history: bool = True) -> str:
+async def _post_venice(data: dict) -> httpx.Response:
+    """POST a chat completion request to Venice once a request slot is free"""
+    async with ai_request_semaphore:
+        # _VENICE_HEADERS already carries the JSON Content-Type for the pre-encoded body
+        return await get_http_client().post(VENICE_API_URL, headers=_VENICE_HEADERS, content=orjson.dumps(data))
+
+async def get_ai_response_with_history(user_id: str, prompt: str, max_tokens: int = 500, use_history: bool = True, use_cache: bool = False) -> str:
     """Get response from Venice AI with chat history context"""
     if not venice_api_key:
         return "AI features are disabled. Please set VENICE_API_KEY environment variable."
     
-    messages = []
-    
-    # Add system message for emoji usage
-    messages.append({"role": "system", "content": "You are Dogbot, a helpful AI assistant with a friendly dog personality! 🐕 Use emojis frequently and Discord formatting to make your responses engaging and fun! Use **bold** for emphasis, *italics* for subtle emphasis, `code blocks` for technical terms, and > quotes for highlighting important information. Keep responses conversational and helpful! 😊✨"})
+    # Start from the system message for emoji usage
+    messages = [_SYSTEM_MSG]
     
     # Add chat history for context if enabled
     if use_history:
@@ -283,11 +632,6 @@ async def get_ai_response_with_history(user_id: str, prompt: str, max_tokens: in
     # Add current message
     messages.append({"role": "user", "content": prompt})
     
-    headers = {
-        "Authorization": f"Bearer {venice_api_key}",
-        "Content-Type": "application/json"
-    }
-    
     data = {
         "model": VENICE_MODEL,
         "messages": messages,
@@ -295,14 +639,22 @@ async def get_ai_response_with_history(user_id: str, prompt: str, max_tokens: in
         "temperature": 0.7
     }
     
+    if use_cache:
+        cache_key = _ai_cache_key(user_id, data)
+        cached = await get_cached_ai_reply(cache_key)
+        if cached is not None:
+            return cached
+    
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(VENICE_API_URL, headers=headers, json=data)
-            response.raise_for_status()
-            
-            result = response.json()
-            return result["choices"][0]["message"]["content"].strip()
-    except httpx.TimeoutException:
+        response = await asyncio.wait_for(_post_venice(data), timeout=AI_RESPONSE_TIMEOUT)
+        response.raise_for_status()
+        
+        result = orjson.loads(response.content)
+        reply = result["choices"][0]["message"]["content"].strip()
+        if use_cache:
+            await store_ai_reply(cache_key, reply)
+        return reply
+    except (httpx.TimeoutException, asyncio.TimeoutError):
         return "⏰ AI response timed out. Please try again."
     except httpx.HTTPStatusError as e:
         return f"❌ AI service error: {e.response.status_code}"
@@ -310,60 +662,45 @@ async def get_ai_response_with_history(user_id: str, prompt: str, max_tokens: in
         return f"❌ Error: {str(e)}"
 
 # Keep the old function for compatibility
-async def get_ai_response(user_id: str, prompt: str, max_tokens: int = 500) -> str:
+async def get_ai_response(user_id: str, prompt: str, max_tokens: int = 500, use_cache: bool = False) -> str:
     """Get response from Venice AI, without chat history context"""
     if not venice_api_key:
         return "AI features are disabled. Please set VENICE_API_KEY environment variable."
     
-    headers = {
-        "Authorization": f"Bearer {venice_api_key}",
-        "Content-Type": "application/json"
-    }
-    
     data = {
         "model": VENICE_MODEL,
         "messages": [
-            {"role": "system", "content": "You are Dogbot, a helpful AI assistant with a friendly dog personality! 🐕 Use emojis frequently and Discord formatting to make your responses engaging and fun! Use **bold** for emphasis, *italics* for subtle emphasis, `code blocks` for technical terms, and > quotes for highlighting important information. Keep responses conversational and helpful! 😊✨"},
+            _SYSTEM_MSG,
             {"role": "user", "content": prompt}
         ],
         "max_tokens": max_tokens,
         "temperature": 0.7
     }
     
+    if use_cache:
+        cache_key = _ai_cache_key(user_id, data)
+        cached = await get_cached_ai_reply(cache_key)
+        if cached is not None:
+            return cached
+    
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(VENICE_API_URL, headers=headers, json=data)
-            response.raise_for_status()
-            
-            result = response.json()
-            return result["choices"][0]["message"]["content"].strip()
-    except httpx.TimeoutException:
+        response = await asyncio.wait_for(_post_venice(data), timeout=AI_RESPONSE_TIMEOUT)
+        response.raise_for_status()
+        
+        result = orjson.loads(response.content)
+        reply = result["choices"][0]["message"]["content"].strip()
+        if use_cache:
+            await store_ai_reply(cache_key, reply)
+        return reply
+    except (httpx.TimeoutException, asyncio.TimeoutError):
         return "⏰ AI response timed out. Please try again."
     except httpx.HTTPStatusError as e:
         return f"❌ AI service error: {e.response.status_code}"
     except Exception as e:
         return f"❌ Error: {str(e)}"
 
-@bot.event
-async def on_ready():
-    global music_bot
-    if bot.user is not None:
-        print(f"We are ready to go in, {bot.user.name}")
-    else:
-        print("We are ready to go in, but bot.user is None")
-    
-    # Cloud environment diagnostics for Render.com
-    print("="*50)
-    print("[RENDER.COM] Environment Diagnostics:")
-    
-    # Check if we're running on Render.com
-    render_service = os.getenv('RENDER_SERVICE_NAME')
-    if render_service:
-        print(f"[RENDER.COM] Service Name: {render_service}")
-    else:
-        print("[RENDER.COM] Not detected (running locally?)")
-    
-    # Check FFmpeg availability
+async def _probe_ffmpeg():
+    """Check FFmpeg availability, log its version and record the result for !audiotest"""
     try:
         # Prefer an explicit ffmpeg executable if available (FFMPEG_PATH or C:\\ffmpeg)
         try:
@@ -372,61 +709,88 @@ async def on_ready():
         except Exception:
             ffmpeg_exec = 'ffmpeg'
 
-        result = subprocess.run([ffmpeg_exec, '-version'], capture_output=True, text=True, timeout=5)
-        if result.returncode == 0:
+        # Run the probe as an async subprocess so gateway events keep flowing while it starts
+        proc = await asyncio.create_subprocess_exec(
+            ffmpeg_exec, '-version',
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            stdout, _ = await asyncio.wait_for(proc.communicate(), timeout=5)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            raise
+        if proc.returncode == 0:
             # Extract version info
-            version_lines = result.stdout.split('\n')
+            version_lines = stdout.decode(errors='replace').split('\n')
             version_line = version_lines[0] if version_lines else "Unknown version"
             
-            print(f"[RENDER.COM] FFmpeg: {version_line}")
+            logger.info("[RENDER.COM] FFmpeg: %s", version_line)
+            _AUDIO_STATUS["ffmpeg"] = "✅ Available"
         else:
-            print("[RENDER.COM] FFmpeg: Available but returned error")
+            logger.warning("[RENDER.COM] FFmpeg: Available but returned error")
+            _AUDIO_STATUS["ffmpeg"] = f"❌ Error: exit code {proc.returncode}"
     except FileNotFoundError:
-               print("[RENDER.COM] FFmpeg: NOT FOUND")
+        logger.warning("[RENDER.COM] FFmpeg: NOT FOUND")
+        _AUDIO_STATUS["ffmpeg"] = "❌ Not found"
     except Exception as e:
-        print(f"[RENDER.COM] FFmpeg: Error checking - {e}")
+        logger.warning("[RENDER.COM] FFmpeg: Error checking - %s", e)
+        _AUDIO_STATUS["ffmpeg"] = f"❌ Error: {str(e)[:50]}"
+
+@bot.event
+async def on_ready():
+    global music_bot, ffmpeg_probed
+    if bot.user is not None:
+        logger.info("We are ready to go in, %s", bot.user.name)
+    else:
+        logger.info("We are ready to go in, but bot.user is None")
+    
+    # Cloud environment diagnostics for Render.com
+    logger.info("[RENDER.COM] Environment Diagnostics:")
+    
+    # Check if we're running on Render.com
+    render_service = os.getenv('RENDER_SERVICE_NAME')
+    if render_service:
+        logger.info("[RENDER.COM] Service Name: %s", render_service)
+    else:
+        logger.info("[RENDER.COM] Not detected (running locally?)")
+    
+    # FFmpeg can't appear or go away while the process runs, so only the first on_ready
+    # probes it; reconnects reuse the result in _AUDIO_STATUS
+    if not ffmpeg_probed:
+        ffmpeg_probed = True
+        await _probe_ffmpeg()
     
     # Check Discord voice support
     try:
         if discord.opus.is_loaded():
-            print("[RENDER.COM] Discord Opus: Loaded")
+            logger.info("[RENDER.COM] Discord Opus: Loaded")
         else:
-            print("[RENDER.COM] Discord Opus: Available but not loaded")
+            logger.warning("[RENDER.COM] Discord Opus: Available but not loaded")
     except Exception as e:
-        print(f"[RENDER.COM] Discord Opus: Error - {e}")
-    
-    print("="*50)
-    
-    # Initialize database
-    await init_database()
-    print("Chat history database initialized")
+        logger.warning("[RENDER.COM] Discord Opus: Error - %s", e)
     
     # Initialize music bot
     music_bot = MusicBot(bot)
-    print("Music bot initialized")
+    logger.info("Music bot initialized")
 
 @bot.event
 async def on_disconnect():
     """Called when the bot disconnects from Discord"""
-    print("[DISCONNECT] ⚠️ Bot disconnected from Discord!")
-    print(f"[DISCONNECT] Time: {datetime.now()}")
+    logger.warning("[DISCONNECT] ⚠️ Bot disconnected from Discord!")
     
 @bot.event
 async def on_resumed():
     """Called when the bot resumes connection after a disconnect"""
-    print("[RESUMED] ✅ Bot resumed connection to Discord!")
-    print(f"[RESUMED] Time: {datetime.now()}")
+    logger.info("[RESUMED] ✅ Bot resumed connection to Discord!")
 
 @bot.event
 async def on_error(event, *args, **kwargs):
     """Global error handler to catch unhandled exceptions"""
-    import traceback
-    print(f"[BOT_ERROR] ❌ Unhandled error in event {event}:")
-    print(f"[BOT_ERROR] Time: {datetime.now()}")
-    traceback.print_exc()
+    logger.exception("[BOT_ERROR] ❌ Unhandled error in event %s", event)
     
     # Try to continue running rather than crash
-    print("[BOT_ERROR] Attempting to continue operation...")
+    logger.info("[BOT_ERROR] Attempting to continue operation...")
 
 @bot.event
 async def on_member_join(member):
@@ -461,24 +825,29 @@ async def on_command_error(ctx, error):
     if isinstance(error, commands.MissingRequiredArgument):
         await ctx.send(f"❌ Missing argument: {error.param.name}")
         return
+    if isinstance(error, NotModerator):
+        await ctx.send(_NO_PERM)
+        return
+    if isinstance(error, commands.CommandOnCooldown):
+        await ctx.send(f"⏳ Slow down! Try again in {error.retry_after:.1f}s")
+        return
     try:
         await ctx.send(f"❌ Error: {error}")
     except Exception:
         pass
-    # Always log traceback for debugging
-    print("[COMMAND_ERROR]", type(error).__name__, "-", error)
+    # Always log the error for debugging
+    logger.error("[COMMAND_ERROR] %s - %s", type(error).__name__, error)
 
 
 @bot.before_invoke
 async def log_command_invocation(ctx):
     try:
-        user = f"{ctx.author} ({ctx.author.id})"
-        cmd = ctx.command.qualified_name if ctx.command else 'unknown'
-        chan = f"#{ctx.channel}"
-        guild = f"{ctx.guild.name} ({ctx.guild.id})" if ctx.guild else 'DM'
-        print(f"[COMMAND] {user} invoked !{cmd} in {chan} @ {guild}")
+        author, command, g = ctx.author, ctx.command, ctx.guild
+        cmd = command.qualified_name if command else 'unknown'
+        guild = f"{g.name} ({g.id})" if g else 'DM'
+        logger.info("[COMMAND] %s (%s) invoked !%s in #%s @ %s", author, author.id, cmd, ctx.channel, guild)
     except Exception as e:
-        print(f"[COMMAND] Invocation log error: {e}")
+        logger.warning("[COMMAND] Invocation log error: %s", e)
 
 
 @bot.event
@@ -490,25 +859,295 @@ async def on_voice_state_update(member, before, after):
     
     # Just log disconnections without auto-rejoin to prevent loops
     if before.channel and after.channel is None:
-        print(f"[MUSIC] Bot disconnected from voice channel {before.channel.name}")
+        logger.info("[MUSIC] Bot disconnected from voice channel %s", before.channel.name)
     elif after.channel and before.channel is None:
-        print(f"[MUSIC] Bot connected to voice channel {after.channel.name}")
+        logger.info("[MUSIC] Bot connected to voice channel %s", after.channel.name)
+
+# guild_id -> IDs of the roles whose names mark them as Admin/Moderator roles.
+# Built on first use and dropped whenever the guild's roles change.
+privileged_role_ids: dict[int, frozenset] = {}
+
+def _get_privileged_role_ids(guild) -> frozenset:
+    """Return (and cache) the IDs of the guild's Admin/Moderator roles"""
+    role_ids = privileged_role_ids.get(guild.id)
+    if role_ids is None:
+        # Guild.roles sorts every role by position; the raw map is enough here
+        ids = set()
+        for role in guild._roles.values():
+            name = role.name.lower()
+            if 'admin' in name or 'moderator' in name or name == 'mod':
+                ids.add(role.id)
+        role_ids = frozenset(ids)
+        privileged_role_ids[guild.id] = role_ids
+    return role_ids
+
+# Self-service roles are looked up by name on every role command; cache the
+# guild's name -> ID mapping so each lookup is a dict fetch instead of a scan
+TRACKED_ROLE_NAMES = frozenset({
+    dogs_role_name, cats_role_name, lizards_role_name, pvp_role_name,
+    elves_role_name, tank_role_name, healer_role_name, dps_role_name,
+})
+ROLE_ID_CACHE: dict[int, dict[str, int]] = {}
+
+def _get_tracked_role(guild, role_name: str):
+    """Return the guild's role with the given tracked name, or None"""
+    role_ids = ROLE_ID_CACHE.get(guild.id)
+    if role_ids is None:
+        # Read the unsorted role map; on duplicate names keep the lowest role,
+        # which is the one discord.utils.get(guild.roles, name=...) returned
+        found = {}
+        for role in guild._roles.values():
+            if role.name in TRACKED_ROLE_NAMES:
+                prev = found.get(role.name)
+                if prev is None or role < prev:
+                    found[role.name] = role
+        role_ids = {name: role.id for name, role in found.items()}
+        ROLE_ID_CACHE[guild.id] = role_ids
+    role_id = role_ids.get(role_name)
+    return guild.get_role(role_id) if role_id else None
+
+def _has_role(member, role_id: int) -> bool:
+    """Check role membership by ID without building the member's Role list"""
+    try:
+        # Member._roles is a sorted SnowflakeList, so has() is a binary search
+        return member._roles.has(role_id)
+    except AttributeError:
+        # Private attribute; fall back to the public list if discord.py changes it
+        return any(r.id == role_id for r in member.roles)
+
+def _invalidate_role_caches(guild):
+    privileged_role_ids.pop(guild.id, None)
+    ROLE_ID_CACHE.pop(guild.id, None)
+
+@bot.event
+async def on_guild_role_create(role):
+    _invalidate_role_caches(role.guild)
+
+@bot.event
+async def on_guild_role_update(before, after):
+    _invalidate_role_caches(after.guild)
+
+@bot.event
+async def on_guild_role_delete(role):
+    _invalidate_role_caches(role.guild)
+
+# Role events are missed while a guild is unavailable, and a guild we left
+# shouldn't keep its entries around
+@bot.event
+async def on_guild_available(guild):
+    _invalidate_role_caches(guild)
+
+@bot.event
+async def on_guild_remove(guild):
+    _invalidate_role_caches(guild)
 
 # Helper function to check for admin/moderator permissions
 def has_admin_or_moderator_role(ctx):
     """Check if user has Admin or Moderator role"""
+    # Remember the answer on the context so repeated checks in one command are free
+    is_mod = getattr(ctx, '_is_moderator', None)
+    if is_mod is None:
+        is_mod = ctx._is_moderator = _check_admin_or_moderator(ctx)
+    return is_mod
+
+def _check_admin_or_moderator(ctx):
     try:
         perms = getattr(ctx.author, 'guild_permissions', None)
         if perms and (perms.administrator or perms.manage_guild or perms.manage_roles):
             return True
-        for role in getattr(ctx.author, 'roles', []):
-            name = getattr(role, 'name', '').lower()
-            if 'admin' in name or 'moderator' in name or name == 'mod':
-                return True
-        return False
+        if ctx.guild is None:
+            return False
+        # Compare role IDs against the cached set instead of re-reading every role name
+        return not _get_privileged_role_ids(ctx.guild).isdisjoint(ctx.author._roles)
     except Exception:
         return False
 
+class NotModerator(commands.CheckFailure):
+    """Raised by admin_or_mod() when the invoker lacks Admin or Moderator role"""
+
+def admin_or_mod():
+    """Command check for moderator-only commands, run before arguments are parsed"""
+    async def predicate(ctx):
+        if not has_admin_or_moderator_role(ctx):
+            raise NotModerator(_NO_PERM)
+        return True
+    return commands.check(predicate)
+
+# One bucket per guild shared by every role-editing command, so switching between
+# !assigndogsrole, !removecatsrolefrom, !assignroles and the rest doesn't reset the limit
+role_edit_buckets = commands.CooldownMapping.from_cooldown(5, 10, commands.BucketType.guild)
+
+def role_edit_cooldown():
+    """Shared per-guild cooldown for moderator role edits so bursts stay under Discord's rate limits"""
+    async def predicate(ctx):
+        bucket = role_edit_buckets.get_bucket(ctx)
+        retry_after = bucket.update_rate_limit() if bucket else None
+        if retry_after:
+            raise commands.CommandOnCooldown(bucket, retry_after, commands.BucketType.guild)
+        return True
+    return commands.check(predicate)
+
+# Changes for a member that arrive while an edit for that member is still in flight
+# are merged and sent together in one follow-up request instead of one request each.
+# A single change uses Discord's per-role add/remove endpoint, which can't touch any
+# other role; only batches with several changes replace the whole role list.
+pending_role_edits: dict[tuple[int, int], dict] = {}  # (guild_id, member_id) -> open batch
+role_edit_chains: dict[tuple[int, int], dict] = {}  # (guild_id, member_id) -> lock serialising edits
+
+async def edit_member_roles(member, add=(), remove=()):
+    """Add and/or remove roles on a member, coalescing concurrent changes into one edit"""
+    key = (member.guild.id, member.id)
+    batch = pending_role_edits.get(key)
+    if batch is None:
+        batch = {
+            'member': member,
+            'add': set(),
+            'remove': set(),
+            'done': asyncio.get_running_loop().create_future(),
+        }
+        pending_role_edits[key] = batch
+        asyncio.create_task(_flush_role_edits(key, batch))
+
+    # Later changes win over earlier ones for the same role
+    for role in add:
+        batch['remove'].discard(role.id)
+        batch['add'].add(role.id)
+    for role in remove:
+        batch['add'].discard(role.id)
+        batch['remove'].add(role.id)
+
+    await asyncio.shield(batch['done'])
+
+async def _flush_role_edits(key, batch):
+    """Send one batch of role changes once any earlier edit for the member has finished"""
+    chain = role_edit_chains.get(key)
+    if chain is None:
+        chain = role_edit_chains[key] = {'lock': asyncio.Lock(), 'waiters': 0}
+    chain['waiters'] += 1
+    try:
+        async with chain['lock']:
+            # Close this batch; anything arriving from now on starts the next one
+            if pending_role_edits.get(key) is batch:
+                del pending_role_edits[key]
+
+            member = batch['member']
+            changes = len(batch['add']) + len(batch['remove'])
+            try:
+                if changes == 1:
+                    # Per-role PUT/DELETE: never reverts roles this bot didn't touch
+                    if batch['add']:
+                        (role_id,) = batch['add']
+                        await member.add_roles(discord.Object(id=role_id))
+                    else:
+                        (role_id,) = batch['remove']
+                        await member.remove_roles(discord.Object(id=role_id))
+                elif changes:
+                    # The cached member can lag behind changes made by other bots or
+                    # moderators, so build the full role list from a fresh copy
+                    fresh = await member.guild.fetch_member(member.id)
+                    new_roles = (set(fresh._roles) | batch['add']) - batch['remove']
+                    await fresh.edit(roles=[discord.Object(id=role_id) for role_id in new_roles])
+            except Exception as e:
+                batch['done'].set_exception(e)
+            else:
+                batch['done'].set_result(None)
+    finally:
+        chain['waiters'] -= 1
+        if not chain['waiters']:
+            role_edit_chains.pop(key, None)
+
+
+# Patterns used by chat's poll parser, compiled once at import
+# Poll option line: "1. x", "2) x", "- x", "* x", "• x" captures x. A bullet character with
+# no space after it ("-5", "**bold**") still counts as an option line and is kept whole.
+_POLL_ITEM_RE = re.compile(r'(?:\d+[.)]\s+|[-*•]\s+|(?=[-*•]))(.*)')
+_STRIP_MARKER_RE = re.compile(r"^(?:\d+[.)]|[-•*]\s+)\s*")
+_AMPM_RE = re.compile(r"\b(?:am|pm)\b", flags=re.IGNORECASE)
+_HOUR_ONLY_RE = re.compile(r"^\d{1,2}(?::\d{2})?$")
+_WIDE_GAP_RE = re.compile(r'\s{2,}')
+_CUSTOM_EMOJI_RE = re.compile(r'^(<a?:\w+:\d+>)\s*(.*)')
+_KEYCAP_RE = re.compile(r'^([0-9]\ufe0f?\u20e3)\s*(.*)')
+# Generic emoji regex for several common emoji blocks.
+# This is not perfect but covers most use-cases we need.
+_EMOJI_RE = re.compile(
+    r'(^|\s)('
+    r'<a?:\w+:\d+>|'  # custom emoji
+    r'[\u2600-\u27BF]\ufe0f?|'  # Misc symbols + Dingbats (adjacent blocks, one class)
+    r'[\U0001F1E6-\U0001F1FF]+|'  # flags
+    r'[\U0001F300-\U0001F5FF]+|'  # symbols & pictographs
+    r'[\U0001F600-\U0001F64F]+|'  # emoticons
+    r'[\U0001F680-\U0001F6FF]+|'  # transport & map
+    r'[0-9]\ufe0f?\u20e3'  # keycap
+    r')', flags=re.UNICODE)
+_SHORTCODE_RE = re.compile(r':([a-z0-9_+-]+):', flags=re.IGNORECASE)
+_TIME_TOKEN_RE = re.compile(r"\d{1,2}(:\d{2})?\s*(am|pm)?", flags=re.IGNORECASE)
+_CLOCK_REQUEST_RE = re.compile(r"clock|clock emoji|map the correct clock|map.*clock", flags=re.IGNORECASE)
+_CLOCK_HOUR_RE = re.compile(r"(\d{1,2})(?::(\d{2}))?\s*(am|pm)?", flags=re.IGNORECASE)
+_BARE_NUMBER_RE = re.compile(r"\b(\d{1,2})\b")
+# Broad emoji-ish pattern: includes common emoji blocks, variation selectors, and ZWJ
+_EMOJI_RUN_RE = re.compile(r'([\U0001F1E6-\U0001F9FF\u2600-\u27BF\u200d\ufe0f]+)', flags=re.UNICODE)
+_CUSTOM_EMOJI_TOKEN_RE = re.compile(r'^<a?:(\w+):(\d+)>$')
+
+# Reaction banks for poll options: number keycaps, then regional indicator letters 🇦..🇿
+# (safe, single-codepoint sequences)
+_NUMBER_EMOJIS = ('1️⃣','2️⃣','3️⃣','4️⃣','5️⃣','6️⃣','7️⃣','8️⃣','9️⃣','🔟')
+_ALPHA_EMOJIS = tuple(chr(0x1F1E6 + i) for i in range(26))
+_NUMBER_EMOJI_SET = frozenset(_NUMBER_EMOJIS)  # O(1) membership for the reaction filter
+# Keycaps, then regional indicators, then a generic button: the bank used to fill unlabeled options
+_FALLBACK_EMOJIS = _NUMBER_EMOJIS + _ALPHA_EMOJIS + ('🔘',)
+# Reactions for dungeon-themed polls; FORCE_SAFE_EMOJI swaps in simpler, widely supported symbols
+_DUNGEON_EMOJIS_DEFAULT = ('🐉','🗡️','🛡️','🧙','🧭','🕯️','🗺️','👹','👾','🧟')
+_DUNGEON_EMOJIS_SAFE = ('⚔️','🛡️','🧭','🗺️','🔮','🕯️','🔱','🏹','🪄','🗡️')
+_DUNGEON_EMOJIS = _DUNGEON_EMOJIS_SAFE if FORCE_SAFE_EMOJI else _DUNGEON_EMOJIS_DEFAULT
+_DUNGEON_KEYWORDS = ('dungeon','dragon','monster','boss','cavern','lair','raid','dnd')
+
+def _looks_like_dungeon(opts) -> bool:
+    """True if any option mentions a dungeon-ish keyword"""
+    # Lowercase all options in one go; no keyword contains '\n', so none can match across options
+    text = '\n'.join(opts).lower()
+    return any(k in text for k in _DUNGEON_KEYWORDS)
+
+def _looks_like_times(opts) -> bool:
+    """True if any option contains a time-like token (an hour, 5pm, 6:30, 1-2)"""
+    # Every hour range also contains an hour, so _TIME_TOKEN_RE alone decides this
+    return any(_TIME_TOKEN_RE.search(o) for o in opts)
+
+# Colon-style shortcodes the AI tends to write instead of the emoji itself
+_SHORTCODE_EMOJIS = {
+    'rainbow': '🌈', 'fire': '🔥', 'snake': '🐍', 'man_detective': '🕵️‍♂️',
+    'wrench': '🔧', 'clock': '⏰', 'cloud': '☁️', 'sun_with_face': '🌞',
+    'ocean': '🌊', 'deciduous_tree': '🌳', 'pirate_flag': '🏴\u200d☠️', 'brain': '🧠',
+    'european_castle': '🏰', 'chart_with_upwards_trend': '📈', 'tada': '🎉'
+}
+
+def _replace_shortcode(m):
+    return _SHORTCODE_EMOJIS.get(m.group(1), m.group(0))
+
+def _find_emoji_tokens(text: str) -> list:
+    """Emoji-like runs in an AI chunk, in order of appearance"""
+    if not text:
+        return []
+    return _EMOJI_RUN_RE.findall(text)
+
+def _expand_shortcodes(text: str):
+    """Expand known :shortcodes: in text into their emoji"""
+    if not text or ':' not in text:
+        return text
+    return _SHORTCODE_RE.sub(_replace_shortcode, text)
+
+DISCORD_MESSAGE_LIMIT = 2000
+
+def _iter_message_chunks(text: str, limit: int = DISCORD_MESSAGE_LIMIT):
+    """Yield pieces of text that fit in one Discord message, breaking at newlines where possible"""
+    start, end = 0, len(text)
+    while end - start > limit:
+        # Break after the last newline in the window unless that leaves a tiny chunk
+        cut = text.rfind('\n', start + limit // 2, start + limit)
+        cut = start + limit if cut == -1 else cut + 1
+        yield text[start:cut]
+        start = cut
+    yield text[start:]
+
 
 @bot.command()
 async def chat(ctx, *, message: str):
@@ -522,6 +1161,11 @@ async def chat(ctx, *, message: str):
         await ctx.send("❌ Please provide a message to chat with the AI.")
         return
 
+    # Decided up front so plain chats don't keep their sent messages around for poll parsing
+    poll_lc = message.lower()
+    # Any text the word-boundary regex used to match also contains both substrings
+    is_poll_request = 'poll' in poll_lc and 'create' in poll_lc
+
     try:
         async with ctx.typing():
             user_id = str(ctx.author.id)
@@ -529,25 +1173,18 @@ async def chat(ctx, *, message: str):
             response = await get_ai_response_with_history(user_id, message)
 
         sent_messages = []
-        # Split long responses into 2000-char chunks and send them sequentially
-        if len(response) > 2000:
-            chunks = [response[i:i+2000] for i in range(0, len(response), 2000)]
-            for chunk in chunks:
-                m = await ctx.send(chunk)
+        # Chunks are sent one at a time so they arrive in order
+        for chunk in _iter_message_chunks(response):
+            m = await ctx.send(chunk)
+            if is_poll_request:
                 sent_messages.append((m, chunk))
-                await asyncio.sleep(0.05)
-        else:
-            m = await ctx.send(response)
-            sent_messages.append((m, response))
 
-        # If the user asked to create a poll, try to parse options and add reactions
-        try:
-            poll_lc = message.lower()
-            is_poll_request = ('poll' in poll_lc and 'create' in poll_lc) or re.search(r"\bcreate\b.*\bpoll\b", poll_lc)
-            if not is_poll_request:
-                return
+        if not is_poll_request:
+            return
 
-            logging.info(f"[POLL] Detected poll request: {poll_lc[:160]}")
+        # The user asked to create a poll: try to parse options and add reactions
+        try:
+            logger.info("[POLL] Detected poll request: %s", poll_lc[:160])
 
             # Lightweight option extractor (tries bullets, numbered lines, or comma lists)
             def extract_poll_options(text: str) -> list:
@@ -557,12 +1194,13 @@ async def chat(ctx, *, message: str):
                     s = line.strip()
                     if not s:
                         continue
-                    if re.match(r'^[\d]+[\.)]\s+', s) or s.startswith(('-', '*', '•')):
-                        # strip leading marker
-                        s2 = re.sub(r'^[\d]+[\.)]\s+|^[\-\*•]\s+', '', s).strip()
+                    # one match both recognises the marker and captures the text after it
+                    m = _POLL_ITEM_RE.match(s)
+                    if m:
+                        s2 = m.group(1).strip()
                         if s2:
                             opts.append(s2)
-                    elif ',' in s and len(s.split(',')) <= 12:
+                    elif ',' in s and s.count(',') <= 11:
                         parts = [p.strip() for p in s.split(',') if p.strip()]
                         if len(parts) > 1:
                             opts.extend(parts)
@@ -575,15 +1213,14 @@ async def chat(ctx, *, message: str):
 
             # helper to parse inline user-provided options
             def parse_inline_from_user(msg_text: str) -> list:
-                parts = [p.strip() for p in re.split(r'[;,\n]', msg_text) if p.strip()]
+                # split on ';', ',' and newlines; two str.replace passes beat a regex split here
+                parts = [p.strip() for p in msg_text.replace(';', '\n').replace(',', '\n').split('\n') if p.strip()]
                 if len(parts) > 1:
                     return parts
                 # try splitting on double spaces
-                parts = [p.strip() for p in re.split(r'\s{2,}', msg_text) if p.strip()]
+                parts = [p.strip() for p in _WIDE_GAP_RE.split(msg_text) if p.strip()]
                 return parts
 
-            number_emojis = ['1️⃣','2️⃣','3️⃣','4️⃣','5️⃣','6️⃣','7️⃣','8️⃣','9️⃣','🔟']
-
             for sent_msg, chunk_text in sent_messages:
                 options = extract_poll_options(chunk_text)
                 if not options:
@@ -592,11 +1229,16 @@ async def chat(ctx, *, message: str):
                 # sanitize & dedupe
                 opts_clean = []
                 seen = set()
+                add_seen, add_opt, strip_marker = seen.add, opts_clean.append, _STRIP_MARKER_RE.sub
                 for o in options:
-                    o_clean = re.sub(r"^(?:\d+[\.)]|[\-•\*]\s+|\d+\.)\s*", '', o).strip()
-                    if o_clean and o_clean.lower() not in seen:
-                        opts_clean.append(o_clean)
-                        seen.add(o_clean.lower())
+                    o_clean = strip_marker('', o).strip()
+                    if not o_clean:
+                        continue
+                    key = o_clean.lower()
+                    if key in seen:
+                        continue
+                    add_opt(o_clean)
+                    add_seen(key)
                     if len(opts_clean) >= 26:
                         break
 
@@ -609,14 +1251,9 @@ async def chat(ctx, *, message: str):
                     # normalize common 'other' phrasing
                     opts_clean = [o if 'other' not in o.lower() else 'Other' for o in opts_clean]
 
-                    # collect items that look like times (contain 'am'/'pm' or standalone hour)
-                    time_like = []
-                    time_re = re.compile(r"\b\d{1,2}(?::\d{2})?\s*(?:am|pm)?\b", flags=re.IGNORECASE)
-                    for o in opts_clean:
-                        # treat as time-like if contains pm/am or is a short digit token
-                        low = o.lower()
-                        if re.search(r"\b(am|pm)\b", low) or re.match(r"^\d{1,2}(?::\d{2})?$", o.strip()):
-                            time_like.append(o)
+                    # collect items that look like times (contain 'am'/'pm' or standalone hour);
+                    # _AMPM_RE ignores case, so the option needs no lowercased copy
+                    time_like = [o for o in opts_clean if _AMPM_RE.search(o) or _HOUR_ONLY_RE.match(o.strip())]
 
                     # If we detected multiple time-like tokens among the parsed options,
                     # prefer them and drop long sentence-like entries.
@@ -628,17 +1265,6 @@ async def chat(ctx, *, message: str):
                     continue
 
                 # Emoji selection heuristics (time vs dungeon vs general)
-                # Emoji banks. If FORCE_SAFE_EMOJI is set, prefer conservative sets
-                dungeon_emojis = ['🐉','🗡️','🛡️','🧙','🧭','🕯️','🗺️','👹','👾','🧟']
-                time_emojis = number_emojis.copy()
-                alpha_emojis = [chr(0x1F1E6 + i) for i in range(26)]
-                if FORCE_SAFE_EMOJI:
-                    # Regional indicator letters 🇦..🇿 are safe and single-codepoint sequences
-                    alpha_emojis = [chr(0x1F1E6 + i) for i in range(26)]
-                    # Reduce dungeon emojis to simple safe symbols if needed
-                    dungeon_emojis = ['⚔️','🛡️','🧭','🗺️','🔮','🕯️','🔱','🏹','🪄','🗡️']
-                    # Keep number keycaps for times and numeric options
-                    time_emojis = number_emojis.copy()
 
                 # Try to detect and extract any leading emoji in each option (the AI
                 # may include its own emoji labels). If present, prefer using the
@@ -653,36 +1279,27 @@ async def chat(ctx, *, message: str):
                     """
                     if not s:
                         return None, s
+                    # Plain-text options are the common case: every unicode emoji and keycap
+                    # needs a non-ASCII character, and custom emoji need a '<'
+                    if s.isascii() and '<' not in s:
+                        return None, s
                     # custom emoji like <a:name:id> at start
-                    m = re.match(r'^(<a?:\w+:\d+>)\s*(.*)', s)
+                    m = _CUSTOM_EMOJI_RE.match(s)
                     if m:
                         return m.group(1), m.group(2).strip()
 
                     # Try to find a keycap (e.g. 1️⃣) or digit+combining marks at start
-                    m = re.match(r'^([0-9]\ufe0f?\u20e3)\s*(.*)', s)
+                    m = _KEYCAP_RE.match(s)
                     if m:
                         return m.group(1), m.group(2).strip()
 
-                    # Generic emoji regex for several common emoji blocks.
-                    # This is not perfect but covers most use-cases we need.
-                    emoji_pattern = re.compile(
-                        r'(^|\s)('
-                        r'<a?:\w+:\d+>|'  # custom emoji
-                        r'[\u2600-\u26FF]\ufe0f?|'  # Misc symbols
-                        r'[\u2700-\u27BF]\ufe0f?|'  # Dingbats
-                        r'[\U0001F1E6-\U0001F1FF]+|'  # flags
-                        r'[\U0001F300-\U0001F5FF]+|'  # symbols & pictographs
-                        r'[\U0001F600-\U0001F64F]+|'  # emoticons
-                        r'[\U0001F680-\U0001F6FF]+|'  # transport & map
-                        r'[0-9]\ufe0f?\u20e3'  # keycap
-                        r')', flags=re.UNICODE)
-
-                    m2 = emoji_pattern.search(s)
+                    m2 = _EMOJI_RE.search(s)
                     if m2:
                         # Use the matched emoji token (strip leading space)
                         token = m2.group(2)
-                        # remove the first occurrence of the token from the string
-                        rest = s.replace(token, '', 1).strip()
+                        # cut the token out at its match offsets instead of searching for it again
+                        start, end = m2.span(2)
+                        rest = (s[:start] + s[end:]).strip()
                         return token, rest
 
                     # Fallback: if first character looks non-ascii and is likely emoji
@@ -696,25 +1313,10 @@ async def chat(ctx, *, message: str):
                 leading = []
                 stripped_labels = []
                 # Expand common colon-style shortcodes like :rainbow: into actual emoji
-                SHORTCODE_TO_EMOJI = {
-                    'rainbow': '🌈', 'fire': '🔥', 'snake': '🐍', 'man_detective': '🕵️‍♂️',
-                    'wrench': '🔧', 'clock': '⏰', 'cloud': '☁️', 'sun_with_face': '🌞',
-                    'ocean': '🌊', 'deciduous_tree': '🌳', 'pirate_flag': '🏴\u200d☠️', 'brain': '🧠',
-                    'european_castle': '🏰', 'chart_with_upwards_trend': '📈', 'tada': '🎉'
-                }
-
-                def expand_shortcodes(text: str):
-                    if not text:
-                        return text
-                    def repl(m):
-                        key = m.group(1)
-                        return SHORTCODE_TO_EMOJI.get(key, m.group(0))
-                    return re.sub(r':([a-z0-9_+-]+):', repl, text, flags=re.IGNORECASE)
-
                 # apply to the chunk and the option texts so later parsing sees real emoji
-                chunk_text = expand_shortcodes(chunk_text)
+                chunk_text = _expand_shortcodes(chunk_text)
                 # expand shortcodes in parsed options too
-                opts_clean = [expand_shortcodes(o) for o in opts_clean]
+                opts_clean = [_expand_shortcodes(o) for o in opts_clean]
                 for o in opts_clean:
                     em, rest = extract_leading_emoji(o)
                     leading.append(em)
@@ -722,23 +1324,18 @@ async def chat(ctx, *, message: str):
                 # replace opts_clean visuals with stripped labels for display
                 opts_display = stripped_labels[:]
 
-                def looks_like_times(opts):
-                    return any(re.search(r"\d{1,2}(:\d{2})?\s*(am|pm)?", o, flags=re.IGNORECASE) or re.search(r"\d{1,2}\s*[-–—]\s*\d{1,2}", o) for o in opts)
-                def looks_like_dungeon(opts):
-                    keywords = ['dungeon','dragon','monster','boss','cavern','lair','raid','dnd','dungeons']
-                    return any(any(k in o.lower() for k in keywords) for o in opts)
-
                 emojis = []
-                if looks_like_dungeon(opts_clean):
-                    emojis = [dungeon_emojis[i % len(dungeon_emojis)] for i in range(len(opts_clean))]
-                elif looks_like_times(opts_clean):
+                is_times = _looks_like_times(opts_clean)
+                if _looks_like_dungeon(opts_clean):
+                    emojis = [_DUNGEON_EMOJIS[i % len(_DUNGEON_EMOJIS)] for i in range(len(opts_clean))]
+                elif is_times:
                     # If the user explicitly asked for clock emoji mapping (e.g.
                     # 'map the correct clock emoji' or mentioned 'clock'), then
                     # deterministically map each parsed hour to the correct clock
                     # glyph (🕐..🕛). Otherwise, fall back to safe random emoji
                     # assignment. This honors the user's explicit instruction even
                     # when FORCE_SAFE_EMOJI is True.
-                    want_clocks = bool(re.search(r"clock|clock emoji|map the correct clock|map.*clock", message, flags=re.IGNORECASE))
+                    want_clocks = bool(_CLOCK_REQUEST_RE.search(message))
 
                     if want_clocks:
                         # deterministic clock mapping
@@ -752,7 +1349,7 @@ async def chat(ctx, *, message: str):
                         # fall back to positional mapping based on numeric content.
                         hours_parsed = []
                         for opt in opts_clean:
-                            m = re.search(r"(\d{1,2})(?::(\d{2}))?\s*(am|pm)?", opt, flags=re.IGNORECASE)
+                            m = _CLOCK_HOUR_RE.search(opt)
                             if m:
                                 h = int(m.group(1))
                                 ampm = m.group(3)
@@ -774,7 +1371,7 @@ async def chat(ctx, *, message: str):
                         if all(h is None for h in hours_parsed):
                             simple_nums = []
                             for opt in opts_clean:
-                                m = re.search(r"\b(\d{1,2})\b", opt)
+                                m = _BARE_NUMBER_RE.search(opt)
                                 simple_nums.append(int(m.group(1)) if m else None)
                             if any(n is not None for n in simple_nums):
                                 hours_parsed = [ (n % 12) if n is not None else None for n in simple_nums]
@@ -802,7 +1399,7 @@ async def chat(ctx, *, message: str):
 
                             # As a last resort, pick the next unused number keycap or alpha
                             if not picked:
-                                for te in number_emojis + alpha_emojis + ['🔘']:
+                                for te in _FALLBACK_EMOJIS:
                                     if te not in used:
                                         picked = te
                                         break
@@ -813,9 +1410,9 @@ async def chat(ctx, *, message: str):
                         # Non-clock safe random assignment (preserve AI leading emojis)
                         extra_safe = ['🔹','🔸','⚪','⚫','🔻','🔺','🟣','🟢','🟡','🔵','🟠','🔴','🟤']
                         if FORCE_SAFE_EMOJI:
-                            safe_pool = number_emojis + alpha_emojis + extra_safe
+                            safe_pool = [*_NUMBER_EMOJIS, *_ALPHA_EMOJIS, *extra_safe]
                         else:
-                            safe_pool = number_emojis + alpha_emojis + ['🎯','🎲','🎴','🪄','🛡️','⚔️'] + extra_safe
+                            safe_pool = [*_NUMBER_EMOJIS, *_ALPHA_EMOJIS, '🎯','🎲','🎴','🪄','🛡️','⚔️', *extra_safe]
 
                         safe_pool = [e for e in safe_pool if e]
                         count = len(opts_clean)
@@ -829,7 +1426,8 @@ async def chat(ctx, *, message: str):
 
                         available = [e for e in safe_pool if e not in used]
                         if len(available) < count:
-                            available = available + [e for e in alpha_emojis if e not in available]
+                            available_set = set(available)
+                            available = available + [e for e in _ALPHA_EMOJIS if e not in available_set]
                         picks = random.sample(available, k=max(0, count - sum(1 for e in emojis if e))) if available else []
                         pi = 0
                         for i in range(count):
@@ -844,15 +1442,15 @@ async def chat(ctx, *, message: str):
                     # default: number keycaps up to 10, then alphabet fallbacks
                     emojis = []
                     for i in range(len(opts_clean)):
-                        if i < len(number_emojis):
-                            emojis.append(number_emojis[i])
+                        if i < len(_NUMBER_EMOJIS):
+                            emojis.append(_NUMBER_EMOJIS[i])
                         else:
-                            emojis.append(alpha_emojis[i - len(number_emojis)])
+                            emojis.append(_ALPHA_EMOJIS[i - len(_NUMBER_EMOJIS)])
 
                 # final dedupe & ensure one-per-option
                 # For time-like polls we've already chosen emojis in order and ensured uniqueness
                 # (used set). Preserve the ordering for time-mode to match the displayed labels.
-                if looks_like_times(opts_clean):
+                if is_times:
                     # if the AI already labeled options with emojis, prefer those
                     final = []
                     for i, cand in enumerate(emojis):
@@ -868,7 +1466,7 @@ async def chat(ctx, *, message: str):
                         cand = emojis[i] if i < len(emojis) else None
                         if cand in used or cand is None:
                             # find first unused
-                            for c in (number_emojis + alpha_emojis + ['🔘']):
+                            for c in _FALLBACK_EMOJIS:
                                 if c not in used:
                                     cand = c
                                     break
@@ -877,46 +1475,8 @@ async def chat(ctx, *, message: str):
 
                 # Edit the message to display labeled options (best-effort)
                     try:
-                        # Helper: extract emoji-like tokens from the whole AI chunk text
-                        def find_emoji_tokens(text: str):
-                            if not text:
-                                return []
-                            # Broad emoji-ish pattern: includes common emoji blocks, variation selectors, and ZWJ
-                            pat = re.compile(r'([\U0001F1E6-\U0001F9FF\u2600-\u26FF\u2700-\u27BF\u200d\ufe0f]+)', flags=re.UNICODE)
-                            toks = [m.group(1) for m in pat.finditer(text)]
-                            return toks
-
-                        chunk_emojis = find_emoji_tokens(chunk_text)
-
-                        # Helper: find an emoji immediately before or after the option text in the chunk
-                        def find_adjacent_emoji(option_text: str, full_text: str):
-                            if not option_text or not full_text:
-                                return None
-                            try:
-                                # escape the option for regex and allow small variations in whitespace
-                                opt_pat = re.escape(option_text.strip())
-                                for m in re.finditer(opt_pat, full_text, flags=re.IGNORECASE):
-                                    s, e = m.start(), m.end()
-                                    # window size (characters) to search for adjacent emojis
-                                    window = 12
-                                    after = full_text[e:e+window]
-                                    before = full_text[max(0, s-window):s]
-
-                                    # emoji-ish regex (covers common blocks and custom emoji)
-                                    adj_pat = re.compile(r'(<a?:\w+:\d+>|[\u2600-\u26FF]\ufe0f?|[\u2700-\u27BF]\ufe0f?|[\U0001F1E6-\U0001F9FF]+|[0-9]\ufe0f?\u20e3)', flags=re.UNICODE)
-
-                                    # prefer emoji immediately after the option (e.g., "Dinner 🍽️")
-                                    m2 = adj_pat.search(after)
-                                    if m2:
-                                        return m2.group(1)
-
-                                    # otherwise check before (e.g., "🍽️ Dinner")
-                                    m3 = list(adj_pat.finditer(before))
-                                    if m3:
-                                        return m3[-1].group(1)
-                                return None
-                            except Exception:
-                                return None
+                        chunk_emojis = _find_emoji_tokens(chunk_text)
+
                         # Build the display_emojis list so that the emoji shown next to
                         # each option is exactly the emoji we will add as a reaction.
                         display_emojis = [None] * len(final)
@@ -949,11 +1509,8 @@ async def chat(ctx, *, message: str):
                                     used_em.add(cand)
 
                         # Third pass: fill with preferred banks ensuring uniqueness
-                        if FORCE_SAFE_EMOJI:
-                            # Prefer number keycaps then regional indicators
-                            banks = number_emojis + alpha_emojis + ['🔘']
-                        else:
-                            banks = number_emojis + alpha_emojis + ['🔘']
+                        # (number keycaps then regional indicators)
+                        banks = _FALLBACK_EMOJIS
                         bidx = 0
                         for i in range(len(final)):
                             if display_emojis[i] is None:
@@ -978,24 +1535,23 @@ async def chat(ctx, *, message: str):
                         if not already_has:
                             new_content = chunk_text + "\n\n" + "Select an option:\n" + "\n".join(display_lines)
                             await sent_msg.edit(content=new_content)
-                            await asyncio.sleep(0.12)
                         # --- Add reactions for this sent_msg (authoritative per-message) ---
                         try:
                             # determine debug flag for this block
                             poll_debug = os.getenv('POLL_DEBUG', '0') == '1'
                             # Determine authoritative reaction list for this message using safe lookups
-                            definitive_msg = locals().get('display_emojis') or locals().get('emojis') or locals().get('reaction_list') or locals().get('ordered') or locals().get('final') or number_emojis[:len(opts_clean)]
+                            definitive_msg = locals().get('display_emojis') or locals().get('emojis') or locals().get('reaction_list') or locals().get('ordered') or locals().get('final') or _NUMBER_EMOJIS[:len(opts_clean)]
                             definitive_msg = definitive_msg[:len(opts_clean)]
 
                             seen_msg = set()
                             final_reactions_msg = []
-                            leading_list = leading if 'leading' in locals() else []
+                            leading_set = set(leading) if 'leading' in locals() else set()
                             for token in definitive_msg:
                                 if not token:
                                     continue
                                 if len(token) == 1 and token.isdigit():
                                     continue
-                                if token in number_emojis and token not in leading_list:
+                                if token in _NUMBER_EMOJI_SET and token not in leading_set:
                                     continue
                                 if token in seen_msg:
                                     continue
@@ -1006,11 +1562,13 @@ async def chat(ctx, *, message: str):
                                 try:
                                     await ctx.send(f"[POLL DEBUG] will add {len(final_reactions_msg)} reactions (for one message): {final_reactions_msg}")
                                 except Exception:
-                                    logging.exception('Failed to send POLL_DEBUG')
+                                    logger.exception('Failed to send POLL_DEBUG')
 
+                            # Added one at a time so they show up in option order; discord.py's
+                            # per-route rate limiter spaces the requests, so no fixed sleep is needed
                             for token in final_reactions_msg:
                                 try:
-                                    m = re.match(r'^<a?:(\w+):(\d+)>$', token)
+                                    m = _CUSTOM_EMOJI_TOKEN_RE.match(token)
                                     if m:
                                         name = m.group(1)
                                         eid = int(m.group(2))
@@ -1018,16 +1576,15 @@ async def chat(ctx, *, message: str):
                                         await sent_msg.add_reaction(pe)
                                     else:
                                         await sent_msg.add_reaction(token)
-                                    await asyncio.sleep(0.18)
                                 except discord.Forbidden:
                                     await ctx.send('❌ I do not have permission to add reactions. Please give me Add Reactions permission.')
                                     break
                                 except Exception as ex:
-                                    logging.exception('[POLL] Failed to add reaction %s: %s', token, ex)
+                                    logger.exception('[POLL] Failed to add reaction %s: %s', token, ex)
                                     continue
                         except Exception:
                             # don't let reaction errors break the whole chat
-                            logging.exception('Failed while preparing reactions for sent_msg')
+                            logger.exception('Failed while preparing reactions for sent_msg')
                     except Exception:
                         pass
 
@@ -1052,13 +1609,9 @@ async def ask(ctx, *, question):
             user_id = str(ctx.author.id)
             response = await get_ai_response(user_id, question)
         
-        # Split long responses if needed
-        if len(response) > 2000:
-            chunks = [response[i:i+2000] for i in range(0, len(response), 2000)]
-            for chunk in chunks:
-                await ctx.send(chunk)
-        else:
-            await ctx.send(response)
+        # Split long responses if needed; chunks are sent in order
+        for chunk in _iter_message_chunks(response):
+            await ctx.send(chunk)
             
     except Exception as e:
         await ctx.send(f"❌ Error processing question: {str(e)}")
@@ -1083,7 +1636,7 @@ async def history(ctx):
     """Show recent chat history"""
     try:
         user_id = str(ctx.author.id)
-        history = await get_chat_history(user_id, limit=5)
+        history = await get_chat_history_preview(user_id, limit=5)
 
         if not history:
             await ctx.send("ℹ️ No chat history found.")
@@ -1094,16 +1647,15 @@ async def history(ctx):
             color=discord.Color.green()
         )
 
-        for i, (user_msg, ai_response) in enumerate(history, 1):
-            # Truncate long messages for display
-            display_user_msg = user_msg[:100] + "..." if len(user_msg) > 100 else user_msg
-            display_ai_response = ai_response[:200] + "..." if len(ai_response) > 200 else ai_response
-
-            embed.add_field(
-                name=f"💬 Exchange {i}",
-                value=f"**You:** {display_user_msg}\n**Dogbot:** {display_ai_response}",
-                inline=False
-            )
+        # Build all fields at once rather than one add_field call per exchange
+        embed._fields = [
+            {
+                "name": f"💬 Exchange {i}",
+                "value": f"**You:** {user_msg}\n**Dogbot:** {ai_response}",
+                "inline": False,
+            }
+            for i, (user_msg, ai_response) in enumerate(history, 1)
+        ]
 
         embed.set_footer(text="Use !clear_history to clear this history")
         await ctx.send(embed=embed)
@@ -1118,6 +1670,8 @@ async def hello(ctx):
 
 
 # Music Bot Commands
+
+
 @bot.command()
 async def join(ctx):
     """Join voice channel and auto-start music"""
@@ -1193,17 +1747,10 @@ async def play(ctx, *, url: str):
         return
     await music_bot.play_url(ctx, url)
 
-@bot.command()
-async def playlist(ctx):
-    """Show current playlist"""
-    if not music_bot:
-        await ctx.send("❌ Music bot is not initialized!")
-        return
-    
-    from playlist import MUSIC_PLAYLISTS
+def _playlist_embed(title: str) -> discord.Embed:
     embed = discord.Embed(
-        title="🎵 Music Playlist",
-        description=f"Total songs: {len(MUSIC_PLAYLISTS)}",
+        title=title,
+        description=f"Total songs: {_PLAYLIST_COUNT}",
         color=discord.Color.blue()
     )
     embed.add_field(
@@ -1211,7 +1758,19 @@ async def playlist(ctx):
         value="[🔗 Click here to view on GitHub](https://github.com/Kameonx/Dogbot/blob/main/playlist.py)",
         inline=False
     )
-    await ctx.send(embed=embed)
+    return embed
+
+# The playlist is fixed at import, so these embeds never change
+_PLAYLIST_EMBED = _playlist_embed("🎵 Music Playlist")
+_QUEUE_EMBED = _playlist_embed("🎵 Music Queue")
+
+@bot.command()
+async def playlist(ctx):
+    """Show current playlist"""
+    if not music_bot:
+        await ctx.send("❌ Music bot is not initialized!")
+        return
+    await ctx.send(embed=_PLAYLIST_EMBED)
 
 @bot.command()
 async def queue(ctx):
@@ -1219,19 +1778,7 @@ async def queue(ctx):
     if not music_bot:
         await ctx.send("❌ Music bot is not initialized!")
         return
-    
-    from playlist import MUSIC_PLAYLISTS
-    embed = discord.Embed(
-        title="🎵 Music Queue",
-        description=f"Total songs: {len(MUSIC_PLAYLISTS)}",
-        color=discord.Color.blue()
-    )
-    embed.add_field(
-        name="View Full Playlist",
-        value="[🔗 Click here to view on GitHub](https://github.com/Kameonx/Dogbot/blob/main/playlist.py)",
-        inline=False
-    )
-    await ctx.send(embed=embed)
+    await ctx.send(embed=_QUEUE_EMBED)
 
 @bot.command()
 async def add(ctx, *, url):
@@ -1277,18 +1824,18 @@ async def status(ctx):
     bot_voice_state = ctx.guild.me.voice
     discord_voice_channel = bot_voice_state.channel.name if bot_voice_state and bot_voice_state.channel else "None"
     
-    # Check if we have a voice client
-    has_voice_client = ctx.voice_client is not None
-    voice_client_connected = ctx.voice_client.is_connected() if ctx.voice_client else False
+    # Check if we have a voice client (ctx.voice_client is a property, so read it once)
+    vc = ctx.voice_client
+    voice_client_connected = vc.is_connected() if vc else False
     
     # Check if music is playing
-    is_playing = ctx.voice_client.is_playing() if ctx.voice_client else False
-    is_paused = ctx.voice_client.is_paused() if ctx.voice_client else False
+    is_playing = vc.is_playing() if vc else False
+    is_paused = vc.is_paused() if vc else False
     
     # Check guild state
     guild_state = music_bot._get_guild_state(guild_id)
-    current_index = guild_state.get('current_index', 0)
-    playlist_length = len(guild_state.get('current_playlist', []))
+    current_index = guild_state.current_index
+    playlist_length = len(guild_state.current_playlist)
     
     embed.add_field(name="Bot Voice Channel", value=discord_voice_channel or "None", inline=True)
     embed.add_field(name="Connected", value="✅ Yes" if voice_client_connected else "❌ No", inline=True)
@@ -1308,423 +1855,262 @@ async def status(ctx):
 
 
 # Role Management Commands
-@bot.command()
-async def dogsrole(ctx):
-    """Add the Dogs role to yourself"""
-    role = discord.utils.get(ctx.guild.roles, name=dogs_role_name)
-    if role is None:
-        await ctx.send(f"❌ The '{dogs_role_name}' role doesn't exist on this server!")
-        return
-    
-    if role in ctx.author.roles:
-        await ctx.send(f"🐕 You already have the {dogs_role_name} role!")
-        return
-    
-    try:
-        await ctx.author.add_roles(role)
-        await ctx.send(f"🐕 Successfully added the {dogs_role_name} role! Woof woof!")
-    except discord.Forbidden:
-        await ctx.send("❌ I don't have permission to assign roles!")
-    except Exception as e:
-        await ctx.send(f"❌ Error adding role: {e}")
 
-@bot.command()
-async def catsrole(ctx):
-    """Add the Cats role to yourself"""
-    role = discord.utils.get(ctx.guild.roles, name=cats_role_name)
+async def _toggle_role(ctx, role_name: str, emoji: str, flair: str = "",
+                       member: Optional[discord.Member] = None, add: bool = True):
+    """Add a self-service role to the caller, or remove it from the caller or @member (moderators only)"""
+    role = _get_tracked_role(ctx.guild, role_name)
     if role is None:
-        await ctx.send(f"❌ The '{cats_role_name}' role doesn't exist on this server!")
+        await ctx.send(_ROLE_MISSING[role_name])
         return
-    
-    if role in ctx.author.roles:
-        await ctx.send(f"🐱 You already have the {cats_role_name} role!")
-        return
-    
-    try:
-        await ctx.author.add_roles(role)
-        await ctx.send(f"🐱 Successfully added the {cats_role_name} role! Meow!")
-    except discord.Forbidden:
-        await ctx.send("❌ I don't have permission to assign roles!")
-    except Exception as e:
-        await ctx.send(f"❌ Error adding role: {e}")
 
-@bot.command()
-async def lizardsrole(ctx):
-    """Add the Lizards role to yourself"""
-    role = discord.utils.get(ctx.guild.roles, name=lizards_role_name)
-    if role is None:
-        await ctx.send(f"❌ The '{lizards_role_name}' role doesn't exist on this server!")
-        return
-    
-    if role in ctx.author.roles:
-        await ctx.send(f"🦎 You already have the {lizards_role_name} role!")
+    if add:
+        author = ctx.author
+        if _has_role(author, role.id):
+            await ctx.send(f"{emoji} You already have the {role_name} role!")
+            return
+        try:
+            await edit_member_roles(author, add=[role])
+            await ctx.send(f"{emoji} Successfully added the {role_name} role!{flair}")
+        except discord.Forbidden:
+            await ctx.send(_CANT_ASSIGN)
+        except Exception as e:
+            await ctx.send(f"❌ Error adding role: {e}")
         return
-    
-    try:
-        await ctx.author.add_roles(role)
-        await ctx.send(f"🦎 Successfully added the {lizards_role_name} role! Hiss!")
-    except discord.Forbidden:
-        await ctx.send("❌ I don't have permission to assign roles!")
-    except Exception as e:
-        await ctx.send(f"❌ Error adding role: {e}")
 
-@bot.command()
-async def pvprole(ctx):
-    """Add the PVP role to yourself"""
-    role = discord.utils.get(ctx.guild.roles, name=pvp_role_name)
-    if role is None:
-        await ctx.send(f"❌ The '{pvp_role_name}' role doesn't exist on this server!")
+    target = member or ctx.author
+    if member is not None and not has_admin_or_moderator_role(ctx):
+        await ctx.send(_NO_PERM_REMOVE)
         return
-    
-    if role in ctx.author.roles:
-        await ctx.send(f"⚔️ You already have the {pvp_role_name} role!")
+
+    if not _has_role(target, role.id):
+        await ctx.send(f"❌ {target.mention if member else 'You'} don't have the {role_name} role!")
         return
-    
+
     try:
-        await ctx.author.add_roles(role)
-        await ctx.send(f"⚔️ Successfully added the {pvp_role_name} role! Ready for battle!")
+        await edit_member_roles(target, remove=[role])
+        if member:
+            await ctx.send(f"{emoji} Successfully removed the {role_name} role from {target.mention}!")
+        else:
+            await ctx.send(f"{emoji} Successfully removed your {role_name} role!")
     except discord.Forbidden:
-        await ctx.send("❌ I don't have permission to assign roles!")
+        await ctx.send(_CANT_REMOVE)
     except Exception as e:
-        await ctx.send(f"❌ Error adding role: {e}")
+        await ctx.send(f"❌ Error removing role: {e}")
+
+# Every role command is generated from this table. Each entry produces
+# !<key>role / !remove<key>role (self-service) and !assign<key>role /
+# !remove<key>rolefrom (moderators, registered further down):
+# (key, role name, emoji, flair on the self-add confirmation, flair on the assign confirmation)
+ROLE_SPECS = [
+    ("dogs", dogs_role_name, "🐕", " Woof woof!", " Woof woof!"),
+    ("cats", cats_role_name, "🐱", " Meow!", " Meow!"),
+    ("lizards", lizards_role_name, "🦎", " Hiss!", " Hiss!"),
+    ("elves", elves_role_name, "🧝", "", ""),
+    ("pvp", pvp_role_name, "⚔️", " Ready for battle!", ""),
+    ("tank", tank_role_name, "🛡️", " Stay strong!", ""),
+    ("healer", healer_role_name, "💚", " Heal on!", ""),
+    ("dps", dps_role_name, "⚔️", " Bring the pain!", ""),
+]
+
+# command name -> (role name, emoji, flair), looked up from the invoked command
+SELF_ROLE_TABLE = {}
+for _key, _role_name, _emoji, _flair, _ in ROLE_SPECS:
+    SELF_ROLE_TABLE[f"{_key}role"] = (_role_name, _emoji, _flair)
+    SELF_ROLE_TABLE[f"remove{_key}role"] = (_role_name, _emoji, "")
+
+async def self_role_command(ctx):
+    """Add a self-service role to yourself"""
+    role_name, emoji, flair = SELF_ROLE_TABLE[ctx.command.name]
+    await _toggle_role(ctx, role_name, emoji, flair)
+
+async def remove_self_role_command(ctx, member: Optional[discord.Member] = None):
+    """Remove a self-service role from yourself, or from @user if you're a moderator"""
+    role_name, emoji, _ = SELF_ROLE_TABLE[ctx.command.name]
+    await _toggle_role(ctx, role_name, emoji, member=member, add=False)
+
+for _cmd_name, (_role_name, _emoji, _flair) in SELF_ROLE_TABLE.items():
+    if _cmd_name.startswith("remove"):
+        bot.command(name=_cmd_name, help=f"Remove the {_role_name} role from yourself, or from @user if you're a moderator")(remove_self_role_command)
+    else:
+        bot.command(name=_cmd_name, help=f"Add the {_role_name} role to yourself")(self_role_command)
+
+# Static, so built once at import
+_MODHELP_EMBED = discord.Embed(
+    title="🛠️ Moderator & Utility Commands",
+    description="Advanced commands for moderators and debugging:",
+    color=discord.Color.orange()
+)
+
+# Role Assignment Commands
+_MODHELP_EMBED.add_field(
+    name="🎭 **Role Commands (Available to All Users)**",
+    value=(
+        "**Add Roles:**\n"
+        "`!dogsrole` - Add Dogs role 🐕\n"
+        "`!catsrole` - Add Cats role 🐱\n"
+        "`!lizardsrole` - Add Lizards role 🦎\n"
+        "`!pvprole` - Add PVP role ⚔️\n"
+        "`!tankrole` - Add Tank role 🛡️\n"
+        "`!healerrole` - Add Healer role 💚\n"
+        "`!dpsrole` - Add DPS role ⚔️\n"
+        "**Remove Roles:**\n"
+        "`!removedogsrole` - Remove Dogs role\n"
+        "`!removecatsrole` - Remove Cats role\n"
+        "`!removelizardsrole` - Remove Lizards role\n"
+        "`!removepvprole` - Remove PVP role\n"
+        "`!removetankrole` - Remove Tank role\n"
+        "`!removehealerrole` - Remove Healer role\n"
+        "`!removedpsrole` - Remove DPS role"
+    ),
+    inline=False
+)
+
+# Moderator Role Assignment Commands
+_MODHELP_EMBED.add_field(
+    name="👑 **Moderator Role Assignment**",
+    value=(
+        "`!assigndogsrole @username` - Assign Dogs role to user\n"
+        "`!removedogsrolefrom @username` - Remove Dogs role from user\n"
+        "`!assigncatsrole @username` - Assign Cats role to user\n"
+        "`!removecatsrolefrom @username` - Remove Cats role from user\n"
+        "`!assignlizardsrole @username` - Assign Lizards role to user\n"
+        "`!removelizardsrolefrom @username` - Remove Lizards role from user\n"
+        "`!assignelvesrole @username` - Assign Elves role to user\n"
+        "`!removeelvesrolefrom @username` - Remove Elves role from user\n"
+        "`!assignpvprole @username` - Assign PVP role to user\n"
+        "`!removepvprolefrom @username` - Remove PVP role from user\n"
+        "`!assigntankrole @username` - Assign Tank role to user\n"
+        "`!removetankrolefrom @username` - Remove Tank role from user\n"
+        "`!assignhealerrole @username` - Assign Healer role to user\n"
+        "`!removehealerrolefrom @username` - Remove Healer role from user\n"
+        "`!assigndpsrole @username` - Assign DPS role to user\n"
+        "`!removedpsrolefrom @username` - Remove DPS role from user"
+    ),
+    inline=False
+)
+
+# Bulk Role Commands
+_MODHELP_EMBED.add_field(
+    name="📦 **Bulk Role Changes**",
+    value=(
+        "`!assignroles @username dogs cats ...` - Assign several roles in one go\n"
+        "`!removeroles @username dogs cats ...` - Remove several roles in one go"
+    ),
+    inline=False
+)
+
+# Test & Debug Commands
+_MODHELP_EMBED.add_field(
+    name="🔧 **Test & Debug**",
+    value=(
+        "`!status` - Check voice channel status\n"
+        "`!audiotest` - Test audio system components\n"
+        "`!voicediag` - Detailed voice connection diagnostics"
+    ),
+    inline=False
+)
+
+# Chat Management
+_MODHELP_EMBED.add_field(
+    name="💬 **Chat Management**",
+    value=(
+        "`!clear_history` - Clear your chat history\n"
+        "`!history` - View your recent chat history"
+    ),
+    inline=False
+)
+
+_MODHELP_EMBED.set_footer(text="🔧 These commands help with troubleshooting and management!")
 
 @bot.command()
-async def elvesrole(ctx):
-    """Add the Elves role to yourself"""
-    role = discord.utils.get(ctx.guild.roles, name=elves_role_name)
-    if role is None:
-        await ctx.send(f"❌ The '{elves_role_name}' role doesn't exist on this server!")
-        return
-    
-    if role in ctx.author.roles:
-        await ctx.send(f"🧝 You already have the {elves_role_name} role!")
-        return
-    
-    try:
-        await ctx.author.add_roles(role)
-        await ctx.send(f"🧝 Successfully added the {elves_role_name} role!")
-    except discord.Forbidden:
-        await ctx.send("❌ I don't have permission to assign roles!")
-    except Exception as e:
-        await ctx.send(f"❌ Error adding role: {e}")
+async def modhelp(ctx):
+    """Show moderator and utility commands"""
+    await ctx.send(embed=_MODHELP_EMBED)
+
+
+# Static, so built once at import like the modhelp embed
+_HELP_EMBED = discord.Embed(
+    title="🐶 Dogbot Help",
+    description="Common commands to interact with Dogbot. Use `!modhelp` for moderator and debug commands.",
+    color=discord.Color.blue()
+)
+
+_HELP_EMBED.add_field(
+    name="💬 Chat & AI",
+    value=(
+        "`!chat <message>` - Chat with the AI and optionally create polls\n"
+        "`!ask <question>` - Ask the AI without conversation memory\n"
+        "`!generate <prompt>` - Generate an AI image (if enabled)\n"
+        "`!clear_history` - Clear your chat history\n"
+        "`!history` - Show recent chat history"
+    ),
+    inline=False
+)
+
+_HELP_EMBED.add_field(
+    name="🎭 Roles",
+    value=(
+        "`!dogsrole`, `!catsrole`, `!lizardsrole`, `!elvesrole` - Add fun server roles to yourself\n"
+        "`!pvprole`, `!tankrole`, `!healerrole`, `!dpsrole` - Add gameplay roles to yourself\n"
+        "Use `!removedogsrole` / `!removecatsrole` / `!removeelvesrole` etc. to remove them from yourself"
+    ),
+    inline=False
+)
+
+_HELP_EMBED.add_field(
+    name="🎵 Music (basic)",
+    value=(
+        "`!join` - Make the bot join your voice channel and start music\n"
+        "`!leave` - Make the bot leave voice channel\n"
+        "`!play <url>` - Play a YouTube URL\n"
+        "`!skip` / `!next` - Skip the current song\n"
+        "`!np` - Show now playing\n"
+        "`!playlist` / `!queue` - Show playlist info"
+    ),
+    inline=False
+)
+
+_HELP_EMBED.add_field(
+    name="🔧 Diagnostics",
+    value=(
+        "`!status` - Voice connection status\n"
+        "`!audiotest` - Test audio system components\n"
+        "`!voicediag` - Detailed voice diagnostics"
+    ),
+    inline=False
+)
+
+_HELP_EMBED.set_footer(text="Use !modhelp to view moderator commands and assignment tools.")
+
+@bot.command(name='help')
+async def help_cmd(ctx):
+    """Show user-facing help for common commands."""
+    await ctx.send(embed=_HELP_EMBED)
+
+## Download command removed: the bot now streams audio only.
 
 @bot.command()
-async def removedogsrole(ctx, member: Optional[discord.Member] = None):
-    """Remove the Dogs role from yourself, or from @user if you're a moderator"""
-    role = discord.utils.get(ctx.guild.roles, name=dogs_role_name)
-    if role is None:
-        await ctx.send(f"❌ The '{dogs_role_name}' role doesn't exist on this server!")
+async def voicediag(ctx):
+    """Diagnostic command for voice connection issues"""
+    if not music_bot:
+        await ctx.send("❌ Music bot is not initialized!")
         return
     
-    target = member or ctx.author
-    if member is not None and not has_admin_or_moderator_role(ctx):
-        await ctx.send("❌ You need Admin or Moderator role to remove roles from others!")
+    # Check user voice state
+    user_voice = ctx.author.voice
+    if not user_voice:
+        await ctx.send("❌ **User Status:** Not in any voice channel")
         return
     
-    if role not in target.roles:
-        await ctx.send(f"❌ {target.mention if member else 'You'} don't have the {dogs_role_name} role!")
-        return
+    user_channel = user_voice.channel
     
-    try:
-        await target.remove_roles(role)
-        if member:
-            await ctx.send(f"🐕 Successfully removed the {dogs_role_name} role from {target.mention}!")
-        else:
-            await ctx.send(f"🐕 Successfully removed your {dogs_role_name} role!")
-    except discord.Forbidden:
-        await ctx.send("❌ I don't have permission to remove roles!")
-    except Exception as e:
-        await ctx.send(f"❌ Error removing role: {e}")
-
-@bot.command()
-async def removecatsrole(ctx, member: Optional[discord.Member] = None):
-    """Remove the Cats role from yourself, or from @user if you're a moderator"""
-    role = discord.utils.get(ctx.guild.roles, name=cats_role_name)
-    if role is None:
-        await ctx.send(f"❌ The '{cats_role_name}' role doesn't exist on this server!")
-        return
-    
-    target = member or ctx.author
-    if member is not None and not has_admin_or_moderator_role(ctx):
-        await ctx.send("❌ You need Admin or Moderator role to remove roles from others!")
-        return
-    
-    if role not in target.roles:
-        await ctx.send(f"❌ {target.mention if member else 'You'} don't have the {cats_role_name} role!")
-        return
-    
-    try:
-        await target.remove_roles(role)
-        if member:
-            await ctx.send(f"🐱 Successfully removed the {cats_role_name} role from {target.mention}!")
-        else:
-            await ctx.send(f"🐱 Successfully removed your {cats_role_name} role!")
-    except discord.Forbidden:
-        await ctx.send("❌ I don't have permission to remove roles!")
-    except Exception as e:
-        await ctx.send(f"❌ Error removing role: {e}")
-
-@bot.command()
-async def removelizardsrole(ctx, member: Optional[discord.Member] = None):
-    """Remove the Lizards role from yourself, or from @user if you're a moderator"""
-    role = discord.utils.get(ctx.guild.roles, name=lizards_role_name)
-    if role is None:
-        await ctx.send(f"❌ The '{lizards_role_name}' role doesn't exist on this server!")
-        return
-    
-    target = member or ctx.author
-    if member is not None and not has_admin_or_moderator_role(ctx):
-        await ctx.send("❌ You need Admin or Moderator role to remove roles from others!")
-        return
-    
-    if role not in target.roles:
-        await ctx.send(f"❌ {target.mention if member else 'You'} don't have the {lizards_role_name} role!")
-        return
-    
-    try:
-        await target.remove_roles(role)
-        if member:
-            await ctx.send(f"🦎 Successfully removed the {lizards_role_name} role from {target.mention}!")
-        else:
-            await ctx.send(f"🦎 Successfully removed your {lizards_role_name} role!")
-    except discord.Forbidden:
-        await ctx.send("❌ I don't have permission to remove roles!")
-    except Exception as e:
-        await ctx.send(f"❌ Error removing role: {e}")
-
-@bot.command()
-async def removeelvesrole(ctx, member: Optional[discord.Member] = None):
-    """Remove the Elves role from yourself, or from @user if you're a moderator"""
-    role = discord.utils.get(ctx.guild.roles, name=elves_role_name)
-    if role is None:
-        await ctx.send(f"❌ The '{elves_role_name}' role doesn't exist on this server!")
-        return
-    
-    target = member or ctx.author
-    if member is not None and not has_admin_or_moderator_role(ctx):
-        await ctx.send("❌ You need Admin or Moderator role to remove roles from others!")
-        return
-    
-    if role not in target.roles:
-        await ctx.send(f"❌ {target.mention if member else 'You'} don't have the {elves_role_name} role!")
-        return
-    
-    try:
-        await target.remove_roles(role)
-        if member:
-            await ctx.send(f"🧝 Successfully removed the {elves_role_name} role from {target.mention}!")
-        else:
-            await ctx.send(f"🧝 Successfully removed your {elves_role_name} role!")
-    except discord.Forbidden:
-        await ctx.send("❌ I don't have permission to remove roles!")
-    except Exception as e:
-        await ctx.send(f"❌ Error removing role: {e}")
-
-@bot.command()
-async def removepvprole(ctx, member: Optional[discord.Member] = None):
-    """Remove the PVP role from yourself or another user (moderator only)"""
-    # If no target, remove from self
-    if member is None:
-        role = discord.utils.get(ctx.guild.roles, name=pvp_role_name)
-        if role is None:
-            await ctx.send(f"❌ The '{pvp_role_name}' role doesn't exist on this server!")
-            return
-        
-        if role not in ctx.author.roles:
-            await ctx.send(f"❌ You don't have the {pvp_role_name} role!")
-            return
-        
-        try:
-            await ctx.author.remove_roles(role)
-            await ctx.send(f"⚔️ Successfully removed your {pvp_role_name} role!")
-        except discord.Forbidden:
-            await ctx.send("❌ I don't have permission to remove roles!")
-        except Exception as e:
-            await ctx.send(f"❌ Error removing role: {e}")
-    else:
-        # Moderator removal
-        if not has_admin_or_moderator_role(ctx):
-            await ctx.send("❌ You need Admin or Moderator role to use this command!")
-            return
-        role = discord.utils.get(ctx.guild.roles, name=pvp_role_name)
-        if role is None:
-            await ctx.send(f"❌ The '{pvp_role_name}' role doesn't exist on this server!")
-            return
-        
-        if role not in member.roles:
-            await ctx.send(f"❌ {member.mention} doesn't have the {pvp_role_name} role!")
-            return
-        
-        try:
-            await member.remove_roles(role)
-            await ctx.send(f"⚔️ Successfully removed the {pvp_role_name} role from {member.mention}!")
-        except discord.Forbidden:
-            await ctx.send("❌ I don't have permission to remove roles!")
-        except Exception as e:
-            await ctx.send(f"❌ Error removing role: {e}")
-
-@bot.command()
-async def modhelp(ctx):
-    """Show moderator and utility commands"""
-    embed = discord.Embed(
-        title="🛠️ Moderator & Utility Commands",
-        description="Advanced commands for moderators and debugging:",
-        color=discord.Color.orange()
-    )
-    
-    # Role Assignment Commands
-    embed.add_field(
-        name="🎭 **Role Commands (Available to All Users)**",
-        value=(
-            "**Add Roles:**\n"
-            "`!dogsrole` - Add Dogs role 🐕\n"
-            "`!catsrole` - Add Cats role 🐱\n"
-            "`!lizardsrole` - Add Lizards role 🦎\n"
-            "`!pvprole` - Add PVP role ⚔️\n"
-            "`!tankrole` - Add Tank role 🛡️\n"
-            "`!healerrole` - Add Healer role 💚\n"
-            "`!dpsrole` - Add DPS role ⚔️\n"
-            "**Remove Roles:**\n"
-            "`!removedogsrole` - Remove Dogs role\n"
-            "`!removecatsrole` - Remove Cats role\n"
-            "`!removelizardsrole` - Remove Lizards role\n"
-            "`!removepvprole` - Remove PVP role\n"
-            "`!removetankrole` - Remove Tank role\n"
-            "`!removehealerrole` - Remove Healer role\n"
-            "`!removedpsrole` - Remove DPS role"
-        ),
-        inline=False
-    )
-    
-    # Moderator Role Assignment Commands
-    embed.add_field(
-        name="👑 **Moderator Role Assignment**",
-        value=(
-            "`!assigndogsrole @username` - Assign Dogs role to user\n"
-            "`!removedogsrolefrom @username` - Remove Dogs role from user\n"
-            "`!assigncatsrole @username` - Assign Cats role to user\n"
-            "`!removecatsrolefrom @username` - Remove Cats role from user\n"
-            "`!assignlizardsrole @username` - Assign Lizards role to user\n"
-            "`!removelizardsrolefrom @username` - Remove Lizards role from user\n"
-            "`!assignelvesrole @username` - Assign Elves role to user\n"
-            "`!removeelvesrolefrom @username` - Remove Elves role from user\n"
-            "`!assignpvprole @username` - Assign PVP role to user\n"
-            "`!removepvprolefrom @username` - Remove PVP role from user\n"
-            "`!assigntankrole @username` - Assign Tank role to user\n"
-            "`!removetankrolefrom @username` - Remove Tank role from user\n"
-            "`!assignhealerrole @username` - Assign Healer role to user\n"
-            "`!removehealerrolefrom @username` - Remove Healer role from user\n"
-            "`!assigndpsrole @username` - Assign DPS role to user\n"
-            "`!removedpsrolefrom @username` - Remove DPS role from user"
-        ),
-        inline=False
-    )
-    
-    # Test & Debug Commands
-    embed.add_field(
-        name="🔧 **Test & Debug**",
-        value=(
-            "`!status` - Check voice channel status\n"
-            "`!audiotest` - Test audio system components\n"
-            "`!voicediag` - Detailed voice connection diagnostics"
-        ),
-        inline=False
-    )
-    
-    # Chat Management
-    embed.add_field(
-        name="💬 **Chat Management**",
-        value=(
-            "`!clear_history` - Clear your chat history\n"
-            "`!history` - View your recent chat history"
-        ),
-        inline=False
-    )
-    
-    embed.set_footer(text="🔧 These commands help with troubleshooting and management!")
-    await ctx.send(embed=embed)
-
-
-@bot.command(name='help')
-async def help_cmd(ctx):
-    """Show user-facing help for common commands."""
-    embed = discord.Embed(
-        title="🐶 Dogbot Help",
-        description="Common commands to interact with Dogbot. Use `!modhelp` for moderator and debug commands.",
-        color=discord.Color.blue()
-    )
-
-    embed.add_field(
-        name="💬 Chat & AI",
-        value=(
-            "`!chat <message>` - Chat with the AI and optionally create polls\n"
-            "`!ask <question>` - Ask the AI without conversation memory\n"
-            "`!generate <prompt>` - Generate an AI image (if enabled)\n"
-            "`!clear_history` - Clear your chat history\n"
-            "`!history` - Show recent chat history"
-        ),
-        inline=False
-    )
-
-    embed.add_field(
-        name="🎭 Roles",
-        value=(
-            "`!dogsrole`, `!catsrole`, `!lizardsrole`, `!elvesrole` - Add fun server roles to yourself\n"
-            "`!pvprole`, `!tankrole`, `!healerrole`, `!dpsrole` - Add gameplay roles to yourself\n"
-            "Use `!removedogsrole` / `!removecatsrole` / `!removeelvesrole` etc. to remove them from yourself"
-        ),
-        inline=False
-    )
-
-    embed.add_field(
-        name="🎵 Music (basic)",
-        value=(
-            "`!join` - Make the bot join your voice channel and start music\n"
-            "`!leave` - Make the bot leave voice channel\n"
-            "`!play <url>` - Play a YouTube URL\n"
-            "`!skip` / `!next` - Skip the current song\n"
-            "`!np` - Show now playing\n"
-            "`!playlist` / `!queue` - Show playlist info"
-        ),
-        inline=False
-    )
-
-    embed.add_field(
-        name="🔧 Diagnostics",
-        value=(
-            "`!status` - Voice connection status\n"
-            "`!audiotest` - Test audio system components\n"
-            "`!voicediag` - Detailed voice diagnostics"
-        ),
-        inline=False
-    )
-
-    embed.set_footer(text="Use !modhelp to view moderator commands and assignment tools.")
-    await ctx.send(embed=embed)
-
-## Download command removed: the bot now streams audio only.
-
-@bot.command()
-async def voicediag(ctx):
-    """Diagnostic command for voice connection issues"""
-    if not music_bot:
-        await ctx.send("❌ Music bot is not initialized!")
-        return
-    
-    # Check user voice state
-    user_voice = ctx.author.voice
-    if not user_voice:
-        await ctx.send("❌ **User Status:** Not in any voice channel")
-        return
-    
-    user_channel = user_voice.channel
-    
-    # Check bot voice state
+    # Read everything the embed needs up front so each lookup happens once
+    guild = ctx.guild
     bot_voice = ctx.voice_client
-    guild_voice = ctx.guild.voice_client
-    
-    # Check permissions
-    permissions = user_channel.permissions_for(ctx.guild.me)
+    guild_voice = guild.voice_client
+    permissions = user_channel.permissions_for(guild.me)
+    opus_loaded = discord.opus.is_loaded()
     
     embed = discord.Embed(title="🔧 Voice Connection Diagnostics", color=0x00ff00)
     
@@ -1738,8 +2124,9 @@ async def voicediag(ctx):
     # Bot voice status
     bot_status = []
     if bot_voice:
+        bot_channel = bot_voice.channel
         bot_status.append(f"Connected: {bot_voice.is_connected()}")
-        bot_status.append(f"Channel: {bot_voice.channel.name if bot_voice.channel else 'None'}")
+        bot_status.append(f"Channel: {bot_channel.name if bot_channel else 'None'}")
         bot_status.append(f"Playing: {bot_voice.is_playing()}")
         bot_status.append(f"Paused: {bot_voice.is_paused()}")
     else:
@@ -1754,8 +2141,9 @@ async def voicediag(ctx):
     # Guild voice status
     guild_status = []
     if guild_voice:
+        guild_channel = guild_voice.channel
         guild_status.append(f"Connected: {guild_voice.is_connected()}")
-        guild_status.append(f"Channel: {guild_voice.channel.name if guild_voice.channel else 'None'}")
+        guild_status.append(f"Channel: {guild_channel.name if guild_channel else 'None'}")
         guild_status.append(f"Same client: {bot_voice is guild_voice}")
     else:
         guild_status.append("No guild voice client found")
@@ -1781,7 +2169,7 @@ async def voicediag(ctx):
     # Opus status
     embed.add_field(
         name="🎵 Audio System",
-        value=f"Opus loaded: {'✅' if discord.opus.is_loaded() else '❌'}",
+        value=f"Opus loaded: {'✅' if opus_loaded else '❌'}",
         inline=True
     )
     
@@ -1802,36 +2190,15 @@ async def audiotest(ctx):
         opus_status = "✅ Loaded" if discord.opus.is_loaded() else "❌ Not loaded"
         embed.add_field(name="Opus Library", value=opus_status, inline=True)
         
-        # Test yt-dlp availability
-        try:
-            import yt_dlp
-            ytdl_status = "✅ Available"
-        except ImportError:
-            ytdl_status = "❌ Not available"
-        embed.add_field(name="yt-dlp", value=ytdl_status, inline=True)
-        
-    # pytube no longer used
-        
-        # Test FFmpeg (try to create a basic instance)
-        try:
-            # This tests if FFmpeg is available without actually connecting
-            test_source = discord.FFmpegPCMAudio("test", before_options="-f lavfi -i anullsrc=duration=0.1", options="-vn")
-            ffmpeg_status = "✅ Available"
-        except Exception as e:
-            ffmpeg_status = f"❌ Error: {str(e)[:50]}"
-        embed.add_field(name="FFmpeg", value=ffmpeg_status, inline=True)
-        
-        # Test basic playlist access
-        try:
-            from playlist import MUSIC_PLAYLISTS
-            playlist_status = f"✅ {len(MUSIC_PLAYLISTS)} songs loaded"
-        except Exception as e:
-            playlist_status = f"❌ Error: {str(e)[:50]}"
-        embed.add_field(name="Playlist", value=playlist_status, inline=True)
+        # yt-dlp, FFmpeg and playlist were checked once at startup
+        embed.add_field(name="yt-dlp", value=_AUDIO_STATUS["yt_dlp"], inline=True)
+        embed.add_field(name="FFmpeg", value=_AUDIO_STATUS["ffmpeg"], inline=True)
+        embed.add_field(name="Playlist", value=_AUDIO_STATUS["playlist"], inline=True)
         
         # Check bot's voice-related permissions (if user is in voice)
-        if ctx.author.voice and ctx.author.voice.channel:
-            channel = ctx.author.voice.channel
+        user_voice = ctx.author.voice
+        if user_voice and user_voice.channel:
+            channel = user_voice.channel
             permissions = channel.permissions_for(ctx.guild.me)
             perm_status = []
             perm_status.append(f"Connect: {'✅' if permissions.connect else '❌'}")
@@ -1881,664 +2248,295 @@ async def volume(ctx, volume: Optional[int] = None):
         # Set volume
         await music_bot.set_volume(ctx, volume)
 
-# Moderator Role Assignment Commands (for admins/moderators to assign roles to others)
-@bot.command()
-async def assigndogsrole(ctx, member: Optional[discord.Member] = None):
-    """Assign Dogs role to a user (moderator only)"""
-    if not has_admin_or_moderator_role(ctx):
-        await ctx.send("❌ You need Admin or Moderator role to use this command!")
-        return
-    
-    if member is None:
-        await ctx.send("❌ Please mention a user to assign the role to! Usage: `!assigndogsrole @username`")
-        return
-    
-    role = discord.utils.get(ctx.guild.roles, name=dogs_role_name)
-    if role is None:
-        await ctx.send(f"❌ The '{dogs_role_name}' role doesn't exist on this server!")
-        return
-    
-    if role in member.roles:
-        await ctx.send(f"🐕 {member.mention} already has the {dogs_role_name} role!")
-        return
-    
-    try:
-        await member.add_roles(role)
-        await ctx.send(f"🐕 Successfully assigned the {dogs_role_name} role to {member.mention}! Woof woof!")
-    except discord.Forbidden:
-        await ctx.send("❌ I don't have permission to assign roles!")
-    except Exception as e:
-        await ctx.send(f"❌ Error assigning role: {e}")
-
-
-@bot.command()
-async def tankrole(ctx):
-    """Add the Tank role to yourself"""
-    role = discord.utils.get(ctx.guild.roles, name=tank_role_name)
-    if role is None:
-        await ctx.send(f"❌ The '{tank_role_name}' role doesn't exist on this server!")
-        return
-
-    if role in ctx.author.roles:
-        await ctx.send(f"🛡️ You already have the {tank_role_name} role!")
-        return
-
-    try:
-        await ctx.author.add_roles(role)
-        await ctx.send(f"🛡️ Successfully added the {tank_role_name} role! Stay strong!")
-    except discord.Forbidden:
-        await ctx.send("❌ I don't have permission to assign roles!")
-    except Exception as e:
-        await ctx.send(f"❌ Error assigning role: {e}")
-
-
-@bot.command()
-async def healerrole(ctx):
-    """Add the Healer role to yourself"""
-    role = discord.utils.get(ctx.guild.roles, name=healer_role_name)
-    if role is None:
-        await ctx.send(f"❌ The '{healer_role_name}' role doesn't exist on this server!")
-        return
-
-    if role in ctx.author.roles:
-        await ctx.send(f"💚 You already have the {healer_role_name} role!")
-        return
-
-    try:
-        await ctx.author.add_roles(role)
-        await ctx.send(f"💚 Successfully added the {healer_role_name} role! Heal on!")
-    except discord.Forbidden:
-        await ctx.send("❌ I don't have permission to assign roles!")
-    except Exception as e:
-        await ctx.send(f"❌ Error assigning role: {e}")
-
 
-@bot.command()
-async def dpsrole(ctx):
-    """Add the DPS role to yourself"""
-    role = discord.utils.get(ctx.guild.roles, name=dps_role_name)
-    if role is None:
-        await ctx.send(f"❌ The '{dps_role_name}' role doesn't exist on this server!")
-        return
+# Moderator Role Assignment Commands (for admins/moderators to assign roles to others),
+# generated from ROLE_SPECS above
+ROLE_COMMAND_ALIASES = {
+    "assignelvesrole": ["assighelvesrole"],  # keep old misspelling as alias
+}
 
-    if role in ctx.author.roles:
-        await ctx.send(f"⚔️ You already have the {dps_role_name} role!")
-        return
+# command name -> (role name, emoji, flair, add?) so the single handler below can
+# look up what to do from the invoked command instead of one function per role
+ROLE_COMMAND_TABLE = {}
+for _key, _role_name, _emoji, _, _flair in ROLE_SPECS:
+    ROLE_COMMAND_TABLE[f"assign{_key}role"] = (_role_name, _emoji, _flair, True)
+    ROLE_COMMAND_TABLE[f"remove{_key}rolefrom"] = (_role_name, _emoji, "", False)
 
-    try:
-        await ctx.author.add_roles(role)
-        await ctx.send(f"⚔️ Successfully added the {dps_role_name} role! Bring the pain!")
-    except discord.Forbidden:
-        await ctx.send("❌ I don't have permission to assign roles!")
-    except Exception as e:
-        await ctx.send(f"❌ Error assigning role: {e}")
+async def moderator_role_command(ctx, member: Optional[discord.Member] = None):
+    """Assign or remove a role on another user (moderator only)"""
+    role_name, emoji, flair, add = ROLE_COMMAND_TABLE[ctx.command.name]
 
-@bot.command()
-async def removedogsrolefrom(ctx, member: Optional[discord.Member] = None):
-    """Remove Dogs role from a user (moderator only)"""
-    if not has_admin_or_moderator_role(ctx):
-        await ctx.send("❌ You need Admin or Moderator role to use this command!")
-        return
-    
     if member is None:
-        await ctx.send("❌ Please mention a user to remove the role from! Usage: `!removedogsrolefrom @username`")
+        direction = "assign the role to" if add else "remove the role from"
+        await ctx.send(f"❌ Please mention a user to {direction}! Usage: `!{ctx.command.name} @username`")
         return
-    
-    role = discord.utils.get(ctx.guild.roles, name=dogs_role_name)
-    if role is None:
-        await ctx.send(f"❌ The '{dogs_role_name}' role doesn't exist on this server!")
-        return
-    
-    if role not in member.roles:
-        await ctx.send(f"❌ {member.mention} doesn't have the {dogs_role_name} role!")
-        return
-    
-    try:
-        await member.remove_roles(role)
-        await ctx.send(f"🐕 Successfully removed the {dogs_role_name} role from {member.mention}!")
-    except discord.Forbidden:
-        await ctx.send("❌ I don't have permission to remove roles!")
-    except Exception as e:
-        await ctx.send(f"❌ Error removing role: {e}")
 
-@bot.command()
-async def assigncatsrole(ctx, member: Optional[discord.Member] = None):
-    """Assign Cats role to a user (moderator only)"""
-    if not has_admin_or_moderator_role(ctx):
-        await ctx.send("❌ You need Admin or Moderator role to use this command!")
-        return
-    
-    if member is None:
-        await ctx.send("❌ Please mention a user to assign the role to! Usage: `!assigncatsrole @username`")
-        return
-    
-    role = discord.utils.get(ctx.guild.roles, name=cats_role_name)
+    role = _get_tracked_role(ctx.guild, role_name)
     if role is None:
-        await ctx.send(f"❌ The '{cats_role_name}' role doesn't exist on this server!")
+        await ctx.send(_ROLE_MISSING[role_name])
         return
-    
-    if role in member.roles:
-        await ctx.send(f"🐱 {member.mention} already has the {cats_role_name} role!")
-        return
-    
-    try:
-        await member.add_roles(role)
-        await ctx.send(f"🐱 Successfully assigned the {cats_role_name} role to {member.mention}! Meow!")
-    except discord.Forbidden:
-        await ctx.send("❌ I don't have permission to assign roles!")
-    except Exception as e:
-        await ctx.send(f"❌ Error assigning role: {e}")
 
-@bot.command()
-async def removecatsrolefrom(ctx, member: Optional[discord.Member] = None):
-    """Remove Cats role from a user (moderator only)"""
-    if not has_admin_or_moderator_role(ctx):
-        await ctx.send("❌ You need Admin or Moderator role to use this command!")
+    has_role = _has_role(member, role.id)
+    if add and has_role:
+        await ctx.send(f"{emoji} {member.mention} already has the {role_name} role!")
         return
-    
-    if member is None:
-        await ctx.send("❌ Please mention a user to remove the role from! Usage: `!removecatsrolefrom @username`")
+    if not add and not has_role:
+        await ctx.send(f"❌ {member.mention} doesn't have the {role_name} role!")
         return
-    
-    role = discord.utils.get(ctx.guild.roles, name=cats_role_name)
-    if role is None:
-        await ctx.send(f"❌ The '{cats_role_name}' role doesn't exist on this server!")
-        return
-    
-    if role not in member.roles:
-        await ctx.send(f"❌ {member.mention} doesn't have the {cats_role_name} role!")
-        return
-    
-    try:
-        await member.remove_roles(role)
-        await ctx.send(f"🐱 Successfully removed the {cats_role_name} role from {member.mention}!")
-    except discord.Forbidden:
-        await ctx.send("❌ I don't have permission to remove roles!")
-    except Exception as e:
-        await ctx.send(f"❌ Error removing role: {e}")
 
-@bot.command()
-async def assignlizardsrole(ctx, member: Optional[discord.Member] = None):
-    """Assign Lizards role to a user (moderator only)"""
-    if not has_admin_or_moderator_role(ctx):
-        await ctx.send("❌ You need Admin or Moderator role to use this command!")
-        return
-    
-    if member is None:
-        await ctx.send("❌ Please mention a user to assign the role to! Usage: `!assignlizardsrole @username`")
-        return
-    
-    role = discord.utils.get(ctx.guild.roles, name=lizards_role_name)
-    if role is None:
-        await ctx.send(f"❌ The '{lizards_role_name}' role doesn't exist on this server!")
-        return
-    
-    if role in member.roles:
-        await ctx.send(f"🦎 {member.mention} already has the {lizards_role_name} role!")
-        return
-    
     try:
-        await member.add_roles(role)
-        await ctx.send(f"🦎 Successfully assigned the {lizards_role_name} role to {member.mention}! Hiss!")
+        if add:
+            await edit_member_roles(member, add=[role])
+            await ctx.send(f"{emoji} Successfully assigned the {role_name} role to {member.mention}!{flair}")
+        else:
+            await edit_member_roles(member, remove=[role])
+            await ctx.send(f"{emoji} Successfully removed the {role_name} role from {member.mention}!")
     except discord.Forbidden:
-        await ctx.send("❌ I don't have permission to assign roles!")
+        await ctx.send(_CANT_ASSIGN if add else _CANT_REMOVE)
     except Exception as e:
-        await ctx.send(f"❌ Error assigning role: {e}")
+        await ctx.send(f"❌ Error {'assigning' if add else 'removing'} role: {e}")
 
-@bot.command()
-async def removelizardsrolefrom(ctx, member: Optional[discord.Member] = None):
-    """Remove Lizards role from a user (moderator only)"""
-    if not has_admin_or_moderator_role(ctx):
-        await ctx.send("❌ You need Admin or Moderator role to use this command!")
-        return
-    if member is None:
-        await ctx.send("❌ Please mention a user to remove the role from! Usage: `!removelizardsrolefrom @username`")
-        return
-    role = discord.utils.get(ctx.guild.roles, name=lizards_role_name)
-    if role is None:
-        await ctx.send(f"❌ The '{lizards_role_name}' role doesn't exist on this server!")
-        return
-    if role not in member.roles:
-        await ctx.send(f"❌ {member.mention} doesn't have the {lizards_role_name} role!")
-        return
-    try:
-        await member.remove_roles(role)
-        await ctx.send(f"🦎 Successfully removed the {lizards_role_name} role from {member.mention}!")
-    except discord.Forbidden:
-        await ctx.send("❌ I don't have permission to remove roles!")
-    except Exception as e:
-        await ctx.send(f"❌ Error removing role: {e}")
+for _cmd_name, (_role_name, _emoji, _flair, _add) in ROLE_COMMAND_TABLE.items():
+    _help = f"Assign {_role_name} role to a user (moderator only)" if _add else f"Remove {_role_name} role from a user (moderator only)"
+    _command = bot.command(name=_cmd_name, aliases=ROLE_COMMAND_ALIASES.get(_cmd_name, []), help=_help)(moderator_role_command)
+    admin_or_mod()(_command)
+    role_edit_cooldown()(_command)
 
-@bot.command()
-async def assignpvprole(ctx, member: Optional[discord.Member] = None):
-    """Assign PVP role to a user (moderator only)"""
-    if not has_admin_or_moderator_role(ctx):
-        await ctx.send("❌ You need Admin or Moderator role to use this command!")
-        return
-    if member is None:
-        await ctx.send("❌ Please mention a user to assign the role to! Usage: `!assignpvprole @username`")
-        return
-    role = discord.utils.get(ctx.guild.roles, name=pvp_role_name)
-    if role is None:
-        await ctx.send(f"❌ The '{pvp_role_name}' role doesn't exist on this server!")
-        return
-    if role in member.roles:
-        await ctx.send(f"⚔️ {member.mention} already has the {pvp_role_name} role!")
-        return
-    try:
-        await member.add_roles(role)
-        await ctx.send(f"⚔️ Successfully assigned the {pvp_role_name} role to {member.mention}!")
-    except discord.Forbidden:
-        await ctx.send("❌ I don't have permission to assign roles!")
-    except Exception as e:
-        await ctx.send(f"❌ Error assigning role: {e}")
+# Bulk variants: change several roles on one user with a single member edit
+ROLE_KEYS = {key: role_name for key, role_name, *_ in ROLE_SPECS}
 
-@bot.command()
-async def removepvprolefrom(ctx, member: Optional[discord.Member] = None):
-    """Remove PVP role from a user (moderator only)"""
-    if not has_admin_or_moderator_role(ctx):
-        await ctx.send("❌ You need Admin or Moderator role to use this command!")
-        return
-    if member is None:
-        await ctx.send("❌ Please mention a user to remove the role from! Usage: `!removepvprolefrom @username`")
-        return
-    role = discord.utils.get(ctx.guild.roles, name=pvp_role_name)
-    if role is None:
-        await ctx.send(f"❌ The '{pvp_role_name}' role doesn't exist on this server!")
-        return
-    if role not in member.roles:
-        await ctx.send(f"❌ {member.mention} doesn't have the {pvp_role_name} role!")
+async def _bulk_role_command(ctx, member, keys, add: bool):
+    """Assign or remove several ROLE_SPECS roles on a user in one edit (moderator only)"""
+    if member is None or not keys:
+        await ctx.send(f"❌ Please mention a user and at least one role! Usage: `!{ctx.command.name} @username dogs cats`")
         return
-    try:
-        await member.remove_roles(role)
-        await ctx.send(f"⚔️ Successfully removed the {pvp_role_name} role from {member.mention}!")
-    except discord.Forbidden:
-        await ctx.send("❌ I don't have permission to remove roles!")
-    except Exception as e:
-        await ctx.send(f"❌ Error removing role: {e}")
 
-
-@bot.command()
-async def assigntankrole(ctx, member: Optional[discord.Member] = None):
-    """Assign Tank role to a user (moderator only)"""
-    if not has_admin_or_moderator_role(ctx):
-        await ctx.send("❌ You need Admin or Moderator role to use this command!")
+    keys = list(dict.fromkeys(key.lower() for key in keys))
+    unknown = [key for key in keys if key not in ROLE_KEYS]
+    if unknown:
+        await ctx.send(f"❌ Unknown role(s): {', '.join(unknown)}. Choose from: {', '.join(ROLE_KEYS)}")
         return
-    if member is None:
-        await ctx.send("❌ Please mention a user to assign the role to! Usage: `!assigntankrole @username`")
-        return
-    role = discord.utils.get(ctx.guild.roles, name=tank_role_name)
-    if role is None:
-        await ctx.send(f"❌ The '{tank_role_name}' role doesn't exist on this server!")
-        return
-    if role in member.roles:
-        await ctx.send(f"🛡️ {member.mention} already has the {tank_role_name} role!")
-        return
-    try:
-        await member.add_roles(role)
-        await ctx.send(f"🛡️ Successfully assigned the {tank_role_name} role to {member.mention}!")
-    except discord.Forbidden:
-        await ctx.send("❌ I don't have permission to assign roles!")
-    except Exception as e:
-        await ctx.send(f"❌ Error assigning role: {e}")
 
+    roles = []
+    for key in keys:
+        role = _get_tracked_role(ctx.guild, ROLE_KEYS[key])
+        if role is None:
+            await ctx.send(_ROLE_MISSING[ROLE_KEYS[key]])
+            return
+        roles.append(role)
 
-@bot.command()
-async def removetankrole(ctx, member: Optional[discord.Member] = None):
-    """Remove the Tank role from yourself, or from @user if you're a moderator"""
-    role = discord.utils.get(ctx.guild.roles, name=tank_role_name)
-    if role is None:
-        await ctx.send(f"❌ The '{tank_role_name}' role doesn't exist on this server!")
-        return
-    target = member or ctx.author
-    if member is not None and not has_admin_or_moderator_role(ctx):
-        await ctx.send("❌ You need Admin or Moderator role to remove roles from others!")
-        return
-    if role not in target.roles:
-        await ctx.send(f"❌ {target.mention if member else 'You'} don't have the {tank_role_name} role!")
-        return
-    try:
-        await target.remove_roles(role)
-        if member:
-            await ctx.send(f"🛡️ Successfully removed the {tank_role_name} role from {target.mention}!")
+    changes = [role for role in roles if _has_role(member, role.id) != add]
+    if not changes:
+        if add:
+            await ctx.send(f"ℹ️ {member.mention} already has all of those roles!")
         else:
-            await ctx.send(f"🛡️ Successfully removed your {tank_role_name} role!")
-    except discord.Forbidden:
-        await ctx.send("❌ I don't have permission to remove roles!")
-    except Exception as e:
-        await ctx.send(f"❌ Error removing role: {e}")
-
-
-@bot.command()
-async def removetankrolefrom(ctx, member: Optional[discord.Member] = None):
-    """Remove Tank role from a user (moderator only)"""
-    if not has_admin_or_moderator_role(ctx):
-        await ctx.send("❌ You need Admin or Moderator role to use this command!")
-        return
-    if member is None:
-        await ctx.send("❌ Please mention a user to remove the role from! Usage: `!removetankrolefrom @username`")
-        return
-    role = discord.utils.get(ctx.guild.roles, name=tank_role_name)
-    if role is None:
-        await ctx.send(f"❌ The '{tank_role_name}' role doesn't exist on this server!")
-        return
-    if role not in member.roles:
-        await ctx.send(f"❌ {member.mention} doesn't have the {tank_role_name} role!")
-        return
-    try:
-        await member.remove_roles(role)
-        await ctx.send(f"🛡️ Successfully removed the {tank_role_name} role from {member.mention}!")
-    except discord.Forbidden:
-        await ctx.send("❌ I don't have permission to remove roles!")
-    except Exception as e:
-        await ctx.send(f"❌ Error removing role: {e}")
-
-
-@bot.command()
-async def assignhealerrole(ctx, member: Optional[discord.Member] = None):
-    """Assign Healer role to a user (moderator only)"""
-    if not has_admin_or_moderator_role(ctx):
-        await ctx.send("❌ You need Admin or Moderator role to use this command!")
-        return
-    if member is None:
-        await ctx.send("❌ Please mention a user to assign the role to! Usage: `!assignhealerrole @username`")
-        return
-    role = discord.utils.get(ctx.guild.roles, name=healer_role_name)
-    if role is None:
-        await ctx.send(f"❌ The '{healer_role_name}' role doesn't exist on this server!")
-        return
-    if role in member.roles:
-        await ctx.send(f"💚 {member.mention} already has the {healer_role_name} role!")
+            await ctx.send(f"❌ {member.mention} doesn't have any of those roles!")
         return
-    try:
-        await member.add_roles(role)
-        await ctx.send(f"💚 Successfully assigned the {healer_role_name} role to {member.mention}!")
-    except discord.Forbidden:
-        await ctx.send("❌ I don't have permission to assign roles!")
-    except Exception as e:
-        await ctx.send(f"❌ Error assigning role: {e}")
-
 
-@bot.command()
-async def removehealerrole(ctx, member: Optional[discord.Member] = None):
-    """Remove the Healer role from yourself, or from @user if you're a moderator"""
-    role = discord.utils.get(ctx.guild.roles, name=healer_role_name)
-    if role is None:
-        await ctx.send(f"❌ The '{healer_role_name}' role doesn't exist on this server!")
-        return
-    target = member or ctx.author
-    if member is not None and not has_admin_or_moderator_role(ctx):
-        await ctx.send("❌ You need Admin or Moderator role to remove roles from others!")
-        return
-    if role not in target.roles:
-        await ctx.send(f"❌ {target.mention if member else 'You'} don't have the {healer_role_name} role!")
-        return
+    names = ", ".join(role.name for role in changes)
     try:
-        await target.remove_roles(role)
-        if member:
-            await ctx.send(f"💚 Successfully removed the {healer_role_name} role from {target.mention}!")
+        if add:
+            await edit_member_roles(member, add=changes)
+            await ctx.send(f"✅ Successfully assigned {names} to {member.mention}!")
         else:
-            await ctx.send(f"💚 Successfully removed your {healer_role_name} role!")
-    except discord.Forbidden:
-        await ctx.send("❌ I don't have permission to remove roles!")
-    except Exception as e:
-        await ctx.send(f"❌ Error removing role: {e}")
-
-
-@bot.command()
-async def removehealerrolefrom(ctx, member: Optional[discord.Member] = None):
-    """Remove Healer role from a user (moderator only)"""
-    if not has_admin_or_moderator_role(ctx):
-        await ctx.send("❌ You need Admin or Moderator role to use this command!")
-        return
-    if member is None:
-        await ctx.send("❌ Please mention a user to remove the role from! Usage: `!removehealerrolefrom @username`")
-        return
-    role = discord.utils.get(ctx.guild.roles, name=healer_role_name)
-    if role is None:
-        await ctx.send(f"❌ The '{healer_role_name}' role doesn't exist on this server!")
-        return
-    if role not in member.roles:
-        await ctx.send(f"❌ {member.mention} doesn't have the {healer_role_name} role!")
-        return
-    try:
-        await member.remove_roles(role)
-        await ctx.send(f"💚 Successfully removed the {healer_role_name} role from {member.mention}!")
+            await edit_member_roles(member, remove=changes)
+            await ctx.send(f"✅ Successfully removed {names} from {member.mention}!")
     except discord.Forbidden:
-        await ctx.send("❌ I don't have permission to remove roles!")
+        await ctx.send(_CANT_ASSIGN if add else _CANT_REMOVE)
     except Exception as e:
-        await ctx.send(f"❌ Error removing role: {e}")
-
-
-@bot.command()
-async def assigndpsrole(ctx, member: Optional[discord.Member] = None):
-    """Assign DPS role to a user (moderator only)"""
-    if not has_admin_or_moderator_role(ctx):
-        await ctx.send("❌ You need Admin or Moderator role to use this command!")
-        return
-    if member is None:
-        await ctx.send("❌ Please mention a user to assign the role to! Usage: `!assigndpsrole @username`")
-        return
-    role = discord.utils.get(ctx.guild.roles, name=dps_role_name)
-    if role is None:
-        await ctx.send(f"❌ The '{dps_role_name}' role doesn't exist on this server!")
-        return
-    if role in member.roles:
-        await ctx.send(f"⚔️ {member.mention} already has the {dps_role_name} role!")
-        return
-    try:
-        await member.add_roles(role)
-        await ctx.send(f"⚔️ Successfully assigned the {dps_role_name} role to {member.mention}!")
-    except discord.Forbidden:
-        await ctx.send("❌ I don't have permission to assign roles!")
-    except Exception as e:
-        await ctx.send(f"❌ Error assigning role: {e}")
-
+        await ctx.send(f"❌ Error {'assigning' if add else 'removing'} roles: {e}")
 
 @bot.command()
-async def removedpsrole(ctx, member: Optional[discord.Member] = None):
-    """Remove the DPS role from yourself, or from @user if you're a moderator"""
-    role = discord.utils.get(ctx.guild.roles, name=dps_role_name)
-    if role is None:
-        await ctx.send(f"❌ The '{dps_role_name}' role doesn't exist on this server!")
-        return
-    target = member or ctx.author
-    if member is not None and not has_admin_or_moderator_role(ctx):
-        await ctx.send("❌ You need Admin or Moderator role to remove roles from others!")
-        return
-    if role not in target.roles:
-        await ctx.send(f"❌ {target.mention if member else 'You'} don't have the {dps_role_name} role!")
-        return
-    try:
-        await target.remove_roles(role)
-        if member:
-            await ctx.send(f"⚔️ Successfully removed the {dps_role_name} role from {target.mention}!")
-        else:
-            await ctx.send(f"⚔️ Successfully removed your {dps_role_name} role!")
-    except discord.Forbidden:
-        await ctx.send("❌ I don't have permission to remove roles!")
-    except Exception as e:
-        await ctx.send(f"❌ Error removing role: {e}")
-
+@admin_or_mod()
+@role_edit_cooldown()
+async def assignroles(ctx, member: Optional[discord.Member] = None, *keys: str):
+    """Assign several roles to a user at once, e.g. !assignroles @user dogs cats (moderator only)"""
+    await _bulk_role_command(ctx, member, keys, add=True)
 
 @bot.command()
-async def removedpsrolefrom(ctx, member: Optional[discord.Member] = None):
-    """Remove DPS role from a user (moderator only)"""
-    if not has_admin_or_moderator_role(ctx):
-        await ctx.send("❌ You need Admin or Moderator role to use this command!")
-        return
-    if member is None:
-        await ctx.send("❌ Please mention a user to remove the role from! Usage: `!removedpsrolefrom @username`")
-        return
-    role = discord.utils.get(ctx.guild.roles, name=dps_role_name)
-    if role is None:
-        await ctx.send(f"❌ The '{dps_role_name}' role doesn't exist on this server!")
-        return
-    if role not in member.roles:
-        await ctx.send(f"❌ {member.mention} doesn't have the {dps_role_name} role!")
-        return
-    try:
-        await member.remove_roles(role)
-        await ctx.send(f"⚔️ Successfully removed the {dps_role_name} role from {member.mention}!")
-    except discord.Forbidden:
-        await ctx.send("❌ I don't have permission to remove roles!")
-    except Exception as e:
-        await ctx.send(f"❌ Error removing role: {e}")
+@admin_or_mod()
+@role_edit_cooldown()
+async def removeroles(ctx, member: Optional[discord.Member] = None, *keys: str):
+    """Remove several roles from a user at once, e.g. !removeroles @user dogs cats (moderator only)"""
+    await _bulk_role_command(ctx, member, keys, add=False)
 
-@bot.command(aliases=["assighelvesrole"])  # keep old misspelling as alias
-async def assignelvesrole(ctx, member: Optional[discord.Member] = None):
-    """Assign Elves role to a user (moderator only)"""
-    if not has_admin_or_moderator_role(ctx):
-        await ctx.send("❌ You need Admin or Moderator role to use this command!")
-        return
-    if member is None:
-        await ctx.send("❌ Please mention a user to assign the role to! Usage: `!assignelvesrole @username`")
-        return
-    role = discord.utils.get(ctx.guild.roles, name=elves_role_name)
-    if role is None:
-        await ctx.send(f"❌ The '{elves_role_name}' role doesn't exist on this server!")
-        return
-    if role in member.roles:
-        await ctx.send(f"🧝 {member.mention} already has the {elves_role_name} role!")
-        return
-    try:
-        await member.add_roles(role)
-        await ctx.send(f"🧝 Successfully assigned the {elves_role_name} role to {member.mention}!")
-    except discord.Forbidden:
-        await ctx.send("❌ I don't have permission to assign roles!")
-    except Exception as e:
-        await ctx.send(f"❌ Error assigning role: {e}")
 
-@bot.command()
-async def removeelvesrolefrom(ctx, member: Optional[discord.Member] = None):
-    """Remove Elves role from a user (moderator only)"""
-    if not has_admin_or_moderator_role(ctx):
-        await ctx.send("❌ You need Admin or Moderator role to use this command!")
-        return
-    if member is None:
-        await ctx.send("❌ Please mention a user to remove the role from! Usage: `!removeelvesrolefrom @username`")
-        return
-    role = discord.utils.get(ctx.guild.roles, name=elves_role_name)
-    if role is None:
-        await ctx.send(f"❌ The '{elves_role_name}' role doesn't exist on this server!")
-        return
-    if role not in member.roles:
-        await ctx.send(f"❌ {member.mention} doesn't have the {elves_role_name} role!")
-        return
-    try:
-        await member.remove_roles(role)
-        await ctx.send(f"🧝 Successfully removed the {elves_role_name} role from {member.mention}!")
-    except discord.Forbidden:
-        await ctx.send("❌ I don't have permission to remove roles!")
-    except Exception as e:
-        await ctx.send(f"❌ Error removing role: {e}")
+# Cap how many images one user can have generating at once. Entries are removed
+# as soon as a user's last generation finishes, so the dict only holds active users.
+MAX_GENERATIONS_PER_USER = 2
+generations_in_flight: dict[int, int] = {}
+# time.monotonic() before which Venice asked us (via Retry-After) not to send image requests
+image_api_retry_at = 0.0
+IMAGE_API_DEFAULT_RETRY = 30.0
 
 @bot.command(name='generate')
+@commands.cooldown(1, 15, commands.BucketType.user)
 async def generate(ctx, *, prompt: Optional[str] = None):
     """Generate an AI image using HiDream model"""
     if not prompt:
+        ctx.command.reset_cooldown(ctx)
         await ctx.send("❌ Please provide a prompt for image generation!")
         return
     if not venice_api_key:
+        ctx.command.reset_cooldown(ctx)
         await ctx.send("❌ AI image generation is disabled. Please set VENICE_API_KEY.")
         return
-    payload = {
-        "prompt": prompt,
-        "model": "hidream",
-        "format": "webp",
-        "width": 1024,
-        "height": 1024,
-        "steps": 20,
-        "safe_mode": True,
-        "hide_watermark": True,
-        "embed_exif_metadata": False,
-        "return_binary": True,  # request base64 image data
-        "seed": 0
-    }
-    headers = {"Authorization": f"Bearer {venice_api_key}", "Content-Type": "application/json"}
+    wait = image_api_retry_at - time.monotonic()
+    if wait > 0:
+        ctx.command.reset_cooldown(ctx)
+        await ctx.send(f"⏳ Image generation is rate limited. Try again in {wait:.1f}s")
+        return
+    user_id = ctx.author.id
+    in_flight = generations_in_flight.get(user_id, 0)
+    if in_flight >= MAX_GENERATIONS_PER_USER:
+        await ctx.send(f"⏳ You already have {in_flight} images generating. Please wait for them to finish!")
+        return
+    generations_in_flight[user_id] = in_flight + 1
+    try:
+        await _generate_image(ctx, prompt)
+    finally:
+        remaining = generations_in_flight[user_id] - 1
+        if remaining:
+            generations_in_flight[user_id] = remaining
+        else:
+            del generations_in_flight[user_id]
+
+async def _send_generated_image(ctx, prompt: str, buffer: io.BytesIO, filename: str):
+    """Post a generated image as an attachment shown inside the result embed"""
+    file = discord.File(buffer, filename=filename)
+    embed = discord.Embed(
+        title="🖼️ AI Image Generation", description=f"Prompt: {prompt}", color=discord.Color.purple()
+    )
+    embed.set_image(url=f"attachment://{filename}")
+    await ctx.send(embed=embed, file=file)
+
+async def _generate_image(ctx, prompt: str):
+    """Request an image from Venice and post it in the invoking channel"""
+    global image_api_retry_at
+    payload = {"prompt": prompt, **_IMAGE_PAYLOAD_TEMPLATE}
     try:
         async with ctx.typing():
-            async with httpx.AsyncClient(timeout=60) as client:
-                resp = await client.post(IMAGE_API_URL, json=payload, headers=headers)
+            # Reuse the shared client's pooled connection; image generation gets a longer timeout
+            async with get_http_client().stream("POST", IMAGE_API_URL, content=orjson.dumps(payload), headers=_IMAGE_HEADERS, timeout=60) as resp:
                 resp.raise_for_status()
                 # Determine if response is JSON or image data
                 content_type = resp.headers.get("Content-Type", "")
                 if content_type.startswith("image"):
-                    img_bytes = resp.content
-                    buffer = io.BytesIO(img_bytes)
+                    # Write the body straight into the upload buffer instead of holding a second copy
+                    buffer = io.BytesIO()
+                    async for chunk in resp.aiter_bytes(65536):
+                        buffer.write(chunk)
                     buffer.seek(0)
-                    file = discord.File(buffer, filename="image.png")
-                    embed = discord.Embed(
-                        title="🖼️ AI Image Generation", description=f"Prompt: {prompt}", color=discord.Color.purple()
-                    )
-                    embed.set_image(url="attachment://image.png")
-                    await ctx.send(embed=embed, file=file)
-                    return
-                # Otherwise parse JSON for image URLs or base64
-                data = resp.json()
-                items = data.get("data", [])
-                
-                if not items:
-                    await ctx.send("❌ No image returned from AI.")
+                    # e.g. "image/webp" -> "webp"
+                    ext = content_type.partition("/")[2].split(";")[0].strip() or payload["format"]
+                    await _send_generated_image(ctx, prompt, buffer, f"image.{ext}")
                     return
-                # Handle base64 encoded image
-                b64_data = items[0].get("b64_json") or items[0].get("image") or items[0].get("base64")
-                if b64_data:
-                    img_bytes = base64.b64decode(b64_data)
-                    buffer = io.BytesIO(img_bytes)
-                    buffer.seek(0)
-                    file = discord.File(buffer, filename="image.png")
-                    embed = discord.Embed(
-                        title="🖼️ AI Image Generation", description=f"Prompt: {prompt}", color=discord.Color.purple()
-                    )
-                    embed.set_image(url="attachment://image.png")
-                    await ctx.send(embed=embed, file=file)
-                    return
-                # Fallback to URL if binary not provided
-                img_url = items[0].get("url") or items[0].get("image_url")
-                if img_url:
-                    embed = discord.Embed(
-                        title="🖼️ AI Image Generation", description=f"Prompt: {prompt}", color=discord.Color.purple()
-                    )
-                    embed.set_image(url=img_url)
-                    await ctx.send(embed=embed)
-                    return
-                await ctx.send("❌ Failed to retrieve image data.")
+                await resp.aread()
+            # Otherwise parse JSON for image URLs or base64
+            data = orjson.loads(resp.content)
+            items = data.get("data", [])
+            
+            if not items:
+                await ctx.send("❌ No image returned from AI.")
+                return
+            # Handle base64 encoded image (fallback path; BytesIO shares the decoded bytes without copying)
+            b64_data = items[0].get("b64_json") or items[0].get("image") or items[0].get("base64")
+            if b64_data:
+                buffer = io.BytesIO(base64.b64decode(b64_data))
+                await _send_generated_image(ctx, prompt, buffer, f"image.{payload['format']}")
+                return
+            # Fallback to URL if binary not provided
+            img_url = items[0].get("url") or items[0].get("image_url")
+            if img_url:
+                embed = discord.Embed(
+                    title="🖼️ AI Image Generation", description=f"Prompt: {prompt}", color=discord.Color.purple()
+                )
+                embed.set_image(url=img_url)
+                await ctx.send(embed=embed)
+                return
+            await ctx.send("❌ Failed to retrieve image data.")
     except httpx.HTTPStatusError as e:
+        if e.response.status_code == 429:
+            # Hold every generate call until Venice's window passes; the user's own cooldown
+            # is cleared since the shared wait above now does the throttling
+            image_api_retry_at = time.monotonic() + _retry_after_seconds(e.response)
+            ctx.command.reset_cooldown(ctx)
         await ctx.send(f"❌ Image generation failed: {e.response.status_code}")
     except Exception as e:
         await ctx.send(f"❌ Error generating image: {e}")
 
-# Web server setup for Render.com port binding
-async def health_check(request):
+def _retry_after_seconds(response: httpx.Response) -> float:
+    """Seconds to wait from a Retry-After header, falling back to IMAGE_API_DEFAULT_RETRY"""
+    try:
+        return max(float(response.headers.get("Retry-After", "")), 0.0)
+    except ValueError:
+        # Missing, or given as an HTTP date
+        return IMAGE_API_DEFAULT_RETRY
+
+# Web server setup for Render.com port binding. The only thing ever requested is the
+# liveness probe, so a bare asyncio listener answers every request with one fixed response.
+_HEALTH_BODY = b"Bot is running!"
+_HEALTH_RESPONSE = (
+    b"HTTP/1.1 200 OK\r\n"
+    b"Content-Type: text/plain; charset=utf-8\r\n"
+    b"Content-Length: " + str(len(_HEALTH_BODY)).encode() + b"\r\n"
+    b"Connection: close\r\n"
+    b"\r\n" + _HEALTH_BODY
+)
+HEALTH_READ_TIMEOUT = 10
+
+async def health_check(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
     """Health check endpoint for Render.com"""
-    return web.Response(text="Bot is running!")
+    try:
+        # Wait for the end of the request headers; the path and method don't matter
+        await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout=HEALTH_READ_TIMEOUT)
+        writer.write(_HEALTH_RESPONSE)
+        await writer.drain()
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
 
 async def init_web_server():
     """Initialize web server for Render.com"""
-    app = web.Application()
-    app.router.add_get('/', health_check)
-    app.router.add_get('/health', health_check)
     port = int(os.getenv('PORT', 10000))
-    runner = web.AppRunner(app)
-    await runner.setup()
-    site = web.TCPSite(runner, '0.0.0.0', port)
-    await site.start()
-    print(f"[RENDER] Web server started on port {port}")
-    return runner
+    server = await asyncio.start_server(health_check, '0.0.0.0', port)
+    logger.info("[RENDER] Web server started on port %s", port)
+    return server
 
 async def main():
     """Start web server and Discord bot"""
-    web_runner = await init_web_server()
-    print("[RENDER] Web server initialized")
-    print("[DISCORD] Starting Discord bot...")
+    web_server = await init_web_server()
+    logger.info("[RENDER] Web server initialized")
+    logger.info("[DISCORD] Starting Discord bot...")
     assert token is not None, "DISCORD_TOKEN must be set"
-    await bot.start(token)
+    # Open the database once here; on_ready fires again on every reconnect
+    await init_database()
+    await prune_ai_cache()
+    start_chat_writer()
+    logger.info("Chat history database initialized")
+    try:
+        await bot.start(token)
+    finally:
+        web_server.close()
+        await close_http_client()
+        await close_database()
 
 if __name__ == '__main__':
+    log_listener.start()
+    logger.info("[STARTUP] Event loop: %s", "uvloop" if uvloop is not None else "asyncio")
     try:
-        asyncio.run(main())
+        # asyncio.Runner (3.11+) takes the loop factory directly instead of a global loop policy
+        if hasattr(asyncio, "Runner"):
+            with asyncio.Runner(loop_factory=uvloop.new_event_loop if uvloop is not None else None) as runner:
+                runner.run(main())
+        else:
+            if uvloop is not None:
+                asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+            asyncio.run(main())
     except KeyboardInterrupt:
-        print("[SHUTDOWN] Bot stopped by user")
+        logger.info("[SHUTDOWN] Bot stopped by user")
     except Exception as e:
-        print(f"[SHUTDOWN] Bot stopped due to error: {e}")
+        logger.error("[SHUTDOWN] Bot stopped due to error: %s", e)
+    finally:
+        log_listener.stop()
@@ -3,6 +3,8 @@ from discord.ext import commands
 import asyncio
 import os
 import random
+from dataclasses import dataclass, field
+from typing import Optional
 import yt_dlp
 from playlist import MUSIC_PLAYLISTS
 
@@ -88,13 +90,25 @@ class YouTubeAudioSource(discord.PCMVolumeTransformer):
             print(f"Audio source error: {e}")
             raise ValueError(f"Failed to create audio source: {str(e)[:100]}")
 
+@dataclass(slots=True)
+class GuildState:
+    """Per-guild playlist position and voice connection bookkeeping"""
+    current_playlist: list = field(default_factory=list)
+    current_index: int = 0
+    connection_failures: int = 0
+    last_failure_time: float = 0
+    fake_connect_count: int = 0
+    last_connect_time: float = 0
+    voice_channel_id: Optional[int] = None
+    play_started_recently: bool = False
+
 class MusicBot:
     """Simplified music bot for cloud deployment"""
     
     def __init__(self, bot):
         self.bot = bot
         # Minimal state management
-        self.guild_states = {}  # guild_id -> {'current_playlist': [], 'current_index': 0}
+        self.guild_states = {}  # guild_id -> GuildState
         # Per-guild connection locks to prevent concurrent connects/loops
         self._connect_locks = {}
 
@@ -107,14 +121,10 @@ class MusicBot:
 
     def _get_guild_state(self, guild_id):
         """Get or create guild state"""
-        if guild_id not in self.guild_states:
-            self.guild_states[guild_id] = {
-                'current_playlist': [],
-                'current_index': 0,
-                'connection_failures': 0,
-                'last_failure_time': 0
-            }
-        return self.guild_states[guild_id]
+        state = self.guild_states.get(guild_id)
+        if state is None:
+            state = self.guild_states[guild_id] = GuildState()
+        return state
 
     def _cleanup_guild_state(self, guild_id):
         """Clean up guild state"""
@@ -133,15 +143,11 @@ class MusicBot:
         state = self._get_guild_state(guild.id)
         lock = self._get_connect_lock(guild.id)
 
-        # Track consecutive fake connections
-        if 'fake_connect_count' not in state:
-            state['fake_connect_count'] = 0
-
         # Determine target channel: user voice > saved voice
         user_voice = getattr(ctx.author, 'voice', None)
         preferred_channel = user_voice.channel if user_voice and user_voice.channel else None
-        if not preferred_channel and state.get('voice_channel_id'):
-            preferred_channel = guild.get_channel(state['voice_channel_id'])
+        if not preferred_channel and state.voice_channel_id:
+            preferred_channel = guild.get_channel(state.voice_channel_id)
         if preferred_channel is None:
             if announce:
                 await ctx.send("❌ Join a voice channel first!")
@@ -164,37 +170,37 @@ class MusicBot:
                                     print(f"[MUSIC] Move did not stabilize, continuing attempts")
                                     # allow outer loop to retry the connection
                                     continue
-                                state['voice_channel_id'] = preferred_channel.id
+                                state.voice_channel_id = preferred_channel.id
                             except Exception as move_exc:
                                 print(f"[MUSIC] Error moving voice client: {move_exc}")
                                 # let the outer loop handle retry/backoff
                                 continue
                         # Check for fake connections (connected but never playing)
                         # Only count once playback had started recently
-                        if not vc.is_playing() and not vc.is_paused() and state.get('play_started_recently'):
-                            state['fake_connect_count'] += 1
-                            print(f"[MUSIC] Fake connect count: {state['fake_connect_count']}")
-                            if state['fake_connect_count'] >= 5:
+                        if not vc.is_playing() and not vc.is_paused() and state.play_started_recently:
+                            state.fake_connect_count += 1
+                            print(f"[MUSIC] Fake connect count: {state.fake_connect_count}")
+                            if state.fake_connect_count >= 5:
                                 print("[MUSIC] HARD CIRCUIT BREAKER: Too many fake connections, forcing disconnect and internal reconnect.")
                                 try:
                                     await vc.disconnect(force=True)
                                 except Exception:
                                     pass
-                                state['fake_connect_count'] = 0
+                                state.fake_connect_count = 0
                                 await asyncio.sleep(1)
                                 # Continue loop to try fresh connect
                                 continue
                         else:
-                            state['fake_connect_count'] = 0
+                            state.fake_connect_count = 0
                         return True
 
                     # Connect fresh
                     # prevent super-rapid retries by enforcing a small gap between connect attempts
-                    last_try = state.get('last_connect_time', 0)
+                    last_try = state.last_connect_time
                     now = asyncio.get_event_loop().time()
                     if now - last_try < 0.5:
                         await asyncio.sleep(0.5)
-                    state['last_connect_time'] = now
+                    state.last_connect_time = now
 
                     print(f"[MUSIC] Connecting to {preferred_channel.name} (attempt {attempt})")
                     try:
@@ -219,8 +225,8 @@ class MusicBot:
                         await asyncio.sleep(0.6 * attempt)
                         continue
 
-                    state['voice_channel_id'] = preferred_channel.id
-                    state['fake_connect_count'] = 0
+                    state.voice_channel_id = preferred_channel.id
+                    state.fake_connect_count = 0
                     # Silent success
                     print(f"[MUSIC] Successfully connected to {preferred_channel.name}")
                     return True
@@ -228,17 +234,17 @@ class MusicBot:
                     msg = str(e).lower()
                     if 'already connected' in msg:
                         print("[MUSIC] Already connected, continuing...")
-                        if state.get('play_started_recently'):
-                            state['fake_connect_count'] = state.get('fake_connect_count', 0) + 1
-                            print(f"[MUSIC] Fake connect count: {state['fake_connect_count']}")
-                        if state.get('fake_connect_count', 0) >= 5:
+                        if state.play_started_recently:
+                            state.fake_connect_count += 1
+                            print(f"[MUSIC] Fake connect count: {state.fake_connect_count}")
+                        if state.fake_connect_count >= 5:
                             print("[MUSIC] HARD CIRCUIT BREAKER: Too many fake connections, forcing disconnect and internal reconnect.")
                             try:
                                 if guild.voice_client:
                                     await guild.voice_client.disconnect(force=True)
                             except Exception:
                                 pass
-                            state['fake_connect_count'] = 0
+                            state.fake_connect_count = 0
                             await asyncio.sleep(1)
                             continue
                         await asyncio.sleep(1.5 * attempt)
@@ -248,7 +254,7 @@ class MusicBot:
                 except Exception as e:
                     print(f"[MUSIC] Connection error: {e}")
                 await asyncio.sleep(1.5 * attempt)  # exponential backoff
-            state['fake_connect_count'] = 0
+            state.fake_connect_count = 0
             return False
 
     async def leave_voice_channel(self, ctx):
@@ -290,11 +296,11 @@ class MusicBot:
             
             # Set up guild state
             state = self._get_guild_state(ctx.guild.id)
-            state['current_playlist'] = playlist
-            state['current_index'] = 0
+            state.current_playlist = playlist
+            state.current_index = 0
             
             # Shuffle playlist
-            random.shuffle(state['current_playlist'])
+            random.shuffle(state.current_playlist)
             
             # No user notification on start
             
@@ -319,8 +325,8 @@ class MusicBot:
             voice_client = ctx.guild.voice_client
             
             state = self._get_guild_state(ctx.guild.id)
-            playlist = state['current_playlist']
-            index = state['current_index']
+            playlist = state.current_playlist
+            index = state.current_index
             
             # Check if playlist finished
             if index >= len(playlist):
@@ -329,8 +335,8 @@ class MusicBot:
                     self._cleanup_guild_state(ctx.guild.id)
                     return
                 # Otherwise reshuffle and restart
-                state['current_index'] = 0
-                random.shuffle(state['current_playlist'])
+                state.current_index = 0
+                random.shuffle(state.current_playlist)
                 # Silent reshuffle and restart
                 await self._play_current_song(ctx)
                 return
@@ -370,8 +376,8 @@ class MusicBot:
                     if any(keyword in err_msg.lower() for keyword in ["connection", "network", "timeout", "tls", "io error", "reset by peer"]):
                         print(f"[MUSIC] Network error detected, will retry this song later")
                         state = self._get_guild_state(ctx.guild.id)
-                        current_url = state['current_playlist'][state['current_index']]
-                        state['current_playlist'].append(current_url)
+                        current_url = state.current_playlist[state.current_index]
+                        state.current_playlist.append(current_url)
                     # Silent failure; advance to next song
                     await self._advance_to_next_song(ctx)
                     return
@@ -396,7 +402,7 @@ class MusicBot:
                             # Mark that playback ended to avoid false fake counts
                             try:
                                 st = self._get_guild_state(ctx.guild.id)
-                                st['play_started_recently'] = False
+                                st.play_started_recently = False
                             except Exception:
                                 pass
                             await self._advance_to_next_song(ctx)
@@ -434,7 +440,7 @@ class MusicBot:
                         else:
                             raise play_err
                     # Mark that playback started to inform connection health
-                    state['play_started_recently'] = True
+                    state.play_started_recently = True
                     print(f"[MUSIC] Successfully started playback: {player.title}")
 
                     # Announce now playing in a relevant text channel
@@ -450,8 +456,8 @@ class MusicBot:
                             target_chan = ctx.channel
                         # Compose link and position info
                         link = getattr(player, 'data', {}).get('webpage_url') or getattr(player, 'url', None) or ''
-                        idx = state.get('current_index', 0)
-                        total = len(state.get('current_playlist', [])) or 0
+                        idx = state.current_index
+                        total = len(state.current_playlist) or 0
                         pos = f" ({idx + 1}/{total})" if total else ""
                         msg = f"🎵 Now playing: **{player.title}**{pos}"
                         if link:
@@ -465,9 +471,9 @@ class MusicBot:
                     if any(keyword in error_str for keyword in ["not connected", "no channel", "connection"]):
                         import time
                         state = self._get_guild_state(ctx.guild.id)
-                        state['connection_failures'] = state.get('connection_failures', 0) + 1
-                        state['last_failure_time'] = time.time()
-                        print(f"[MUSIC] Connection failure #{state['connection_failures']} detected")
+                        state.connection_failures += 1
+                        state.last_failure_time = time.time()
+                        print(f"[MUSIC] Connection failure #{state.connection_failures} detected")
                     elif any(keyword in error_str for keyword in ["tls", "network", "io error", "reset by peer"]):
                         print(f"[MUSIC] Network error detected (not counting as connection failure): {e}")
                     await asyncio.sleep(3 if "network" in error_str or "tls" in error_str else 2)
@@ -488,15 +494,15 @@ class MusicBot:
 
             # Circuit breaker: if we've had too many failures recently, back off silently
             current_time = time.time()
-            if current_time - state.get('last_failure_time', 0) < 60:  # Within last minute
-                failure_count = state.get('connection_failures', 0)
+            if current_time - state.last_failure_time < 60:  # Within last minute
+                failure_count = state.connection_failures
                 if failure_count >= 5:
                     print(f"[MUSIC] Circuit breaker: {failure_count} failures in last minute; backing off")
                     await asyncio.sleep(15)
-                    state['connection_failures'] = 0
+                    state.connection_failures = 0
             else:
                 # Reset failure count if it's been more than a minute
-                state['connection_failures'] = 0
+                state.connection_failures = 0
 
             # Check if still connected to voice
             voice_client = ctx.guild.voice_client
@@ -505,44 +511,44 @@ class MusicBot:
                 reconnected = await self._ensure_voice(ctx, announce=False)
                 if not reconnected:
                     print("[MUSIC] Could not reconnect, incrementing failure count")
-                    state['connection_failures'] = state.get('connection_failures', 0) + 1
-                    state['last_failure_time'] = current_time
+                    state.connection_failures += 1
+                    state.last_failure_time = current_time
 
                     # If we've failed too many times, wait longer before trying again
-                    if state['connection_failures'] >= 5:
+                    if state.connection_failures >= 5:
                         print("[MUSIC] Multiple connection failures, pausing for recovery (silent)")
                         await asyncio.sleep(10)
                         # Reset failure count after pause
-                        state['connection_failures'] = 0
+                        state.connection_failures = 0
                     else:
                         # Wait longer before next attempt
                         await asyncio.sleep(3)
                         return
 
             # Reset failure count on successful connection
-            state['connection_failures'] = 0
-            state['current_index'] += 1
+            state.connection_failures = 0
+            state.current_index += 1
             await self._play_current_song(ctx)
 
         except Exception as e:
             print(f"[MUSIC] Error advancing to next song: {e}")
             state = self._get_guild_state(ctx.guild.id)
-            state['connection_failures'] = state.get('connection_failures', 0) + 1
-            state['last_failure_time'] = time.time()
+            state.connection_failures += 1
+            state.last_failure_time = time.time()
 
             # Try to continue anyway, but with limits
-            if state['connection_failures'] < 5:
+            if state.connection_failures < 5:
                 try:
-                    state['current_index'] += 1
+                    state.current_index += 1
                     await asyncio.sleep(5)  # Longer delay before retry
                     await self._play_current_song(ctx)
                 except Exception as retry_e:
                     print(f"[MUSIC] Retry also failed: {retry_e}")
-                    state['connection_failures'] += 1
+                    state.connection_failures += 1
             else:
                 print(f"[MUSIC] Too many failures; backing off and continuing silently")
                 await asyncio.sleep(15)
-                state['connection_failures'] = 0
+                state.connection_failures = 0
 
     async def skip_song(self, ctx):
         """Skip current song"""
@@ -608,8 +614,8 @@ class MusicBot:
             title = source.title if hasattr(source, 'title') else "Unknown"
             
             state = self._get_guild_state(ctx.guild.id)
-            current_index = state['current_index']
-            playlist_length = len(state['current_playlist'])
+            current_index = state.current_index
+            playlist_length = len(state.current_playlist)
             
             status = "▶️ Playing" if ctx.voice_client.is_playing() else "⏸️ Paused"
 
@@ -630,10 +636,10 @@ class MusicBot:
         prev_state = self.guild_states.get(ctx.guild.id)
         saved_state = None
         if prev_state:
-            saved_state = {
-                'current_playlist': list(prev_state['current_playlist']),
-                'current_index': prev_state['current_index']
-            }
+            saved_state = GuildState(
+                current_playlist=list(prev_state.current_playlist),
+                current_index=prev_state.current_index
+            )
         # Remove state so playlist callbacks are suppressed
         self.guild_states.pop(ctx.guild.id, None)
         # Stop any current playback
@@ -652,15 +658,15 @@ class MusicBot:
                 print(f"[MUSIC] URL playback error: {error}")
             # Restore previous playlist state
             if saved_state is not None:
-                restored_index = saved_state['current_index'] + 1
-                playlist = saved_state['current_playlist']
+                restored_index = saved_state.current_index + 1
+                playlist = saved_state.current_playlist
                 if restored_index >= len(playlist):
                     restored_index = 0
                     random.shuffle(playlist)
-                self.guild_states[ctx.guild.id] = {
-                    'current_playlist': playlist,
-                    'current_index': restored_index
-                }
+                self.guild_states[ctx.guild.id] = GuildState(
+                    current_playlist=playlist,
+                    current_index=restored_index
+                )
             # Advance to next song from restored state
             try:
                 print(f"[MUSIC] Resuming playlist after URL playback in guild {ctx.guild.id}")